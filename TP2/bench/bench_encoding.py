@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la codificación de la respuesta de /scrape.
+
+Compara el formato anterior (json.dumps con indent=4) contra JSON compacto
+(json estándar y orjson si está instalado) y mide los bytes enviados con
+y sin gzip/deflate, sobre una respuesta sintética con un screenshot y
+thumbnails en Base64 de tamaño realista.
+
+Uso: python3 bench/bench_encoding.py [--repeat N]
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.serialization import orjson
+
+def make_png(width: int, height: int) -> bytes:
+    """PNG con ruido (poco comprimible, como un screenshot real)."""
+    try:
+        from PIL import Image
+        img = Image.frombytes("RGB", (width, height), os.urandom(width * height * 3))
+        img = img.reduce(4).resize((width, height)) # Ruido suavizado
+        out = io.BytesIO()
+        img.save(out, format="PNG")
+        return out.getvalue()
+    except ImportError:
+        return os.urandom(width * height // 2)
+
+def make_response() -> dict:
+    screenshot = base64.b64encode(make_png(1280, 720)).decode()
+    thumbnails = [base64.b64encode(make_png(150, 100)).decode() for _ in range(5)]
+    return {
+        "url": "https://example.com/",
+        "timestamp": "2025-01-01T00:00:00Z",
+        "scraping_data": {
+            "title": "Example Domain",
+            "links": [f"https://example.com/section/{i}/article-{i * 7}" for i in range(300)],
+            "meta_tags": {"description": "Example", "og:title": "Example Domain"},
+            "structure": {"h1": 1, "h2": 12, "h3": 30, "h4": 0, "h5": 0, "h6": 0},
+            "images_count": 42,
+        },
+        "processing_data": {
+            "screenshot": screenshot,
+            "performance": {"load_time_ms": 812, "total_size_kb": 1534.2, "num_requests": 61},
+            "thumbnails": thumbnails,
+        },
+        "status": "success",
+    }
+
+def timed(func, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de codificación de respuestas de /scrape")
+    parser.add_argument("--repeat", type=int, default=20, help="Repeticiones por caso (se toma la mejor)")
+    args = parser.parse_args()
+
+    data = make_response()
+    encoders = {
+        "json indent=4 (antes)": lambda: json.dumps(data, indent=4).encode("utf-8"),
+        "json compacto": lambda: json.dumps(data, separators=(",", ":")).encode("utf-8"),
+    }
+    if orjson is not None:
+        encoders["orjson compacto"] = lambda: orjson.dumps(data)
+
+    print(f"{'codificación':<24} {'encode ms':>10} {'bytes':>10} {'gzip ms':>9} {'gzip bytes':>11}")
+    for name, encode in encoders.items():
+        body, encode_s = timed(encode, args.repeat)
+        compressed, gzip_s = timed(lambda: zlib.compress(body, 6), max(1, args.repeat // 4))
+        print(f"{name:<24} {encode_s * 1000:>10.2f} {len(body):>10} {gzip_s * 1000:>9.2f} {len(compressed):>11}")
+
+if __name__ == "__main__":
+    main()
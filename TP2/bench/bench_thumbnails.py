@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark del pipeline de thumbnails de Servidor B.
+
+Sobre el corpus de imágenes de bench/images compara la forma anterior
+(thumbnail() con sus valores por defecto y guardar en PNG) contra el
+pipeline actual (decode_thumbnail + encode_thumbnail) en cada formato de
+salida, midiendo el tiempo de decodificación + reducción, el de
+codificación y los bytes.
+
+Uso: python3 bench/bench_thumbnails.py [--repeat N] [--quality Q] [--images DIR]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+from processor.image_processor import (
+    THUMBNAIL_SIZE, DEFAULT_THUMBNAIL_QUALITY, decode_thumbnail, encode_thumbnail
+)
+
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
+
+def decode_previous(data: bytes) -> Image.Image:
+    """Forma anterior: thumbnail() tal cual, sin convertir las imágenes con paleta."""
+    img = Image.open(io.BytesIO(data))
+    img.thumbnail(THUMBNAIL_SIZE)
+    return img
+
+def encode_png(img: Image.Image) -> bytes:
+    out = io.BytesIO()
+    img.save(out, format="PNG")
+    return out.getvalue()
+
+def timed(func, arg, repeat: int):
+    """Mejor tiempo de 'repeat' corridas y el último resultado."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def load_corpus(directory: str) -> list:
+    corpus = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path) and not name.startswith("."):
+            with open(path, "rb") as f:
+                corpus.append((name, f.read()))
+    return corpus
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline de thumbnails")
+    parser.add_argument('--repeat', type=int, default=20, help="Repeticiones por medición (se toma la mejor)")
+    parser.add_argument('--quality', type=int, default=DEFAULT_THUMBNAIL_QUALITY, help="Calidad de WebP/JPEG")
+    parser.add_argument('--images', default=IMAGES_DIR, help="Directorio con el corpus de imágenes")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.images)
+    if not corpus:
+        sys.exit(f"No hay imágenes en {args.images}")
+
+    # (nombre, decodificación, codificación)
+    pipelines = [("anterior (png)", decode_previous, encode_png)]
+    for fmt in ("png", "jpeg", "webp"):
+        pipelines.append((
+            f"actual + {fmt}" + ("" if fmt == "png" else f" q{args.quality}"),
+            decode_thumbnail,
+            lambda img, fmt=fmt: encode_thumbnail(img, fmt, args.quality),
+        ))
+
+    print(f"Corpus: {len(corpus)} imágenes ({sum(len(d) for _, d in corpus) / 1024:.0f} KB), "
+          f"thumbnail {THUMBNAIL_SIZE[0]}x{THUMBNAIL_SIZE[1]}, mejor de {args.repeat}\n")
+    header = f"{'imagen':<18} {'pipeline':<26} {'decodif. ms':>12} {'codif. ms':>10} {'bytes':>8}"
+    print(header)
+    print("-" * len(header))
+
+    totals = {name: [0.0, 0.0, 0] for name, _, _ in pipelines}
+    skipped = []
+    for image_name, data in corpus:
+        rows = []
+        for name, decode, encode in pipelines:
+            decode_time, img = timed(decode, data, args.repeat)
+            try:
+                encode_time, out = timed(encode, img, args.repeat)
+            except OSError as e:
+                # El pipeline anterior no sabía guardar, p. ej., JPEG CMYK como PNG
+                print(f"{image_name:<18} {name:<26} {decode_time * 1000:>12.2f} {'falla':>10}  ({e})")
+                rows = None
+                continue
+            print(f"{image_name:<18} {name:<26} {decode_time * 1000:>12.2f} {encode_time * 1000:>10.2f} {len(out):>8}")
+            if rows is not None:
+                rows.append((name, decode_time, encode_time, len(out)))
+        print()
+
+        # Los totales solo suman imágenes que todos los pipelines procesaron
+        if rows is None:
+            skipped.append(image_name)
+            continue
+        for name, decode_time, encode_time, size in rows:
+            totals[name][0] += decode_time
+            totals[name][1] += encode_time
+            totals[name][2] += size
+
+    print("Totales del corpus" + (f" (sin {', '.join(skipped)})" if skipped else "") + ":")
+    base_time = sum(totals[pipelines[0][0]][:2])
+    for name, (decode_time, encode_time, size) in totals.items():
+        total = decode_time + encode_time
+        print(f"  {name:<26} {decode_time * 1000:>8.1f} ms + {encode_time * 1000:>7.1f} ms "
+              f"= {total * 1000:>8.1f} ms ({base_time / total:>4.1f}x)  {size / 1024:>7.1f} KB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Servidor B falso para pruebas de carga sin Selenium ni red.
+
+Habla el mismo protocolo que server_processing.py (mensajes con request_id,
+respuestas con screenshot y thumbnails como adjuntos binarios) pero en lugar
+de abrir un navegador espera un tiempo configurable y devuelve imágenes
+generadas una sola vez al iniciar.
+
+Uso: python3 bench/fake_processor.py -i 127.0.0.1 -p 8001 --delay 0.5 --jitter 0.2
+"""
+import argparse
+import io
+import logging
+import os
+import random
+import socketserver
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.protocol import recv_message, send_message, ConnectionClosed
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [Servidor B falso] [%(levelname)s] %(message)s')
+log = logging.getLogger(__name__)
+
+MAX_THUMBNAILS = 5
+
+def make_png(width: int, height: int) -> bytes:
+    """PNG de prueba (bytes aleatorios si Pillow no está instalado)."""
+    try:
+        from PIL import Image
+        img = Image.frombytes("RGB", (width, height), os.urandom(width * height * 3))
+        img = img.reduce(8).resize((width, height))
+        out = io.BytesIO()
+        img.save(out, format="PNG")
+        return out.getvalue()
+    except ImportError:
+        return os.urandom(width * height // 4)
+
+class FakeTaskHandler(socketserver.BaseRequestHandler):
+    """Igual que TaskHandler de B: conexión persistente, un hilo por trabajo."""
+
+    def setup(self):
+        self.send_lock = threading.Lock()
+
+    def handle(self):
+        try:
+            while True:
+                job = recv_message(self.request)
+                threading.Thread(target=self.run_job, args=(job,), daemon=True).start()
+        except ConnectionClosed:
+            pass
+        except ConnectionError:
+            log.warning(f"Conexión con {self.client_address} perdida.")
+
+    def run_job(self, job: dict):
+        server = self.server
+        start = time.perf_counter()
+        delay = max(0.0, server.delay + random.uniform(-server.jitter, server.jitter))
+        time.sleep(delay)
+
+        response = {
+            "screenshot": server.screenshot,
+            "performance": {"load_time_ms": round(delay * 1000), "total_size_kb": 0, "num_requests": 1},
+            "thumbnails": [server.thumbnail] * min(MAX_THUMBNAILS, len(job.get("image_urls", []))),
+            "timings": {"navigation": delay, "capture_total": time.perf_counter() - start},
+        }
+        if job.get("request_id") is not None:
+            response["request_id"] = job["request_id"]
+        try:
+            with self.send_lock:
+                send_message(self.request, response)
+        except OSError:
+            pass # A cerró la conexión
+
+class FakeProcessingServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Servidor B falso para pruebas de carga",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument('-i', '--ip', default="127.0.0.1", help="Dirección de escucha")
+    parser.add_argument('-p', '--port', type=int, default=8001, help="Puerto de escucha")
+    parser.add_argument('--delay', type=float, default=0.5, help="Segundos que 'tarda' cada trabajo")
+    parser.add_argument('--jitter', type=float, default=0.1, help="Variación aleatoria (+/-) del delay")
+    args = parser.parse_args()
+
+    server = FakeProcessingServer((args.ip, args.port), FakeTaskHandler)
+    server.delay = args.delay
+    server.jitter = args.jitter
+    server.screenshot = make_png(1280, 720)
+    server.thumbnail = make_png(150, 100)
+
+    log.info(f"Servidor B falso en {args.ip}:{args.port} (delay {args.delay}s ± {args.jitter}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
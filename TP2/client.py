@@ -2,8 +2,11 @@
 import asyncio
 import aiohttp
 import argparse
+import itertools
 import json
+import math
 import sys
+import time
 
 # Valores por defecto del cliente
 DEFAULT_URL = "https://www.example.com"
@@ -11,6 +14,10 @@ DEFAULT_HOST = "127.0.0.1"
 DEFAULT_PORT = 8080
 DEFAULT_TIMEOUT = 150 # Timeout alto para esperar al Servidor B
 
+# Valores por defecto del modo carga
+DEFAULT_LOAD_CONCURRENCY = 10
+DEFAULT_LOAD_DURATION = 30
+
 
 def build_endpoint(host: str, port: int) -> str:
     """
@@ -82,6 +89,202 @@ async def solicitar_scrape(url: str, host: str, port: int, timeout: int):
         print(f"\n[ERROR] Error inesperado en el cliente: {e}")
 
 
+async def solicitar_scrape_stream(url: str, host: str, port: int, timeout: int):
+    """
+    Igual que solicitar_scrape pero en modo streaming (NDJSON): muestra los
+    datos de scraping apenas llegan y luego los del Servidor B.
+    """
+    endpoint = build_endpoint(host, port)
+    params = {"url": url, "stream": "1"}
+
+    print("\n=== Cliente de Prueba - Scraping Distribuido (streaming) ===")
+    print(f"- Destino a scrapear : {url}")
+    print(f"- Endpoint           : {endpoint}\n")
+
+    timeout_cfg = aiohttp.ClientTimeout(total=timeout)
+    start = time.monotonic()
+
+    try:
+        async with aiohttp.ClientSession(timeout=timeout_cfg) as session:
+            print("[INFO] Solicitando al Servidor A...")
+            async with session.get(endpoint, params=params) as resp:
+                print(f"[INFO] HTTP recibido: {resp.status} {resp.reason}")
+
+                if resp.content_type != "application/x-ndjson":
+                    # Error antes de empezar el stream (JSON normal)
+                    print(json.dumps(await resp.json(), indent=4, ensure_ascii=False))
+                    return
+
+                async for line in resp.content:
+                    if not line.strip():
+                        continue
+                    event = json.loads(line)
+                    elapsed = time.monotonic() - start
+
+                    if event.get("event") == "scraping_data":
+                        scraping = event.get("scraping_data", {})
+                        print(f"\n--- Scraping ({elapsed:.2f} s) ---")
+                        print(f"Título detectado : {scraping.get('title', 'N/D')}")
+                        print(f"Enlaces          : {len(scraping.get('links', []))}")
+                        print(f"Imágenes         : {scraping.get('images_count', 0)}")
+                        print(json.dumps(scraping, indent=4, ensure_ascii=False))
+
+                    elif event.get("event") == "processing_data":
+                        processing = event.get("processing_data", {})
+                        print(f"\n--- Procesamiento ({elapsed:.2f} s) ---")
+                        print(f"Estado reportado : {event.get('status', 'desconocido')}")
+                        if processing.get("error"):
+                            print(f"Error Procesamiento: {processing['error']}")
+                        elif processing.get("screenshot"):
+                            print(f"Screenshot       : Recibido ({len(processing['screenshot'])} bytes)")
+                        else:
+                            print("Screenshot       : No recibido")
+                        print(f"Rendimiento      : {processing.get('performance', {})}")
+                        print(f"Thumbnails       : {len(processing.get('thumbnails', []))}")
+
+    except aiohttp.ClientConnectorError:
+        print(f"\n[ERROR] No se pudo conectar con {host}:{port}. ¿El servidor A está en ejecución?")
+    except asyncio.TimeoutError:
+        print(f"\n[ERROR] Se alcanzó el timeout de {timeout} segundos esperando la respuesta del Servidor A.")
+    except Exception as e:
+        print(f"\n[ERROR] Error inesperado en el cliente: {e}")
+
+
+def percentile(ordered: list, q: float) -> float:
+    """Percentil 'q' (0-100) de una lista ya ordenada (nearest-rank)."""
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def leer_urls(path: str) -> list:
+    """Lee una URL por línea (ignora líneas vacías y comentarios con #)."""
+    with open(path, encoding="utf-8") as f:
+        urls = [line.strip() for line in f]
+    return [u for u in urls if u and not u.startswith("#")]
+
+
+async def ejecutar_carga(urls: list, host: str, port: int, timeout: int, concurrency: int,
+                         duration: float, rate: float, loop_mode: str, compress: bool = True) -> dict:
+    """
+    Genera carga contra GET /scrape durante 'duration' segundos.
+
+    - closed: 'concurrency' clientes, cada uno envía la siguiente petición
+      cuando recibe la respuesta anterior ('rate' limita el total si es > 0).
+    - open: las peticiones salen a 'rate' por segundo sin esperar a las
+      anteriores; la latencia se mide desde el instante previsto de envío,
+      así las demoras del servidor no se esconden. Si ya hay 'concurrency'
+      peticiones en vuelo, la petición se descarta y se cuenta como 'dropped'.
+
+    Con compress=False se pide la respuesta sin comprimir (Accept-Encoding: identity).
+    """
+    endpoint = build_endpoint(host, port)
+    url_cycle = itertools.cycle(urls)
+    latencies = []
+    status_counts = {}
+    errors = {}
+    dropped = 0
+    in_flight = 0
+
+    timeout_cfg = aiohttp.ClientTimeout(total=timeout)
+    connector = aiohttp.TCPConnector(limit=0) # El límite lo pone 'concurrency'
+    headers = None if compress else {"Accept-Encoding": "identity"}
+
+    async def una_peticion(session, scheduled_at: float):
+        nonlocal in_flight
+        in_flight += 1
+        try:
+            async with session.get(endpoint, params={"url": next(url_cycle)}, headers=headers) as resp:
+                await resp.read()
+                status_counts[resp.status] = status_counts.get(resp.status, 0) + 1
+                if resp.status < 400:
+                    latencies.append(time.monotonic() - scheduled_at)
+        except asyncio.TimeoutError:
+            errors["timeout"] = errors.get("timeout", 0) + 1
+        except aiohttp.ClientError as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+        finally:
+            in_flight -= 1
+
+    start = time.monotonic()
+    deadline = start + duration
+    interval = 1 / rate if rate > 0 else 0.0
+
+    async with aiohttp.ClientSession(timeout=timeout_cfg, connector=connector) as session:
+        if loop_mode == "open":
+            pending = set()
+            for n in itertools.count():
+                scheduled_at = start + n * interval
+                if scheduled_at >= deadline:
+                    break
+                await asyncio.sleep(max(0.0, scheduled_at - time.monotonic()))
+                if in_flight >= concurrency:
+                    dropped += 1
+                    continue
+                task = asyncio.create_task(una_peticion(session, scheduled_at))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        else:
+            counter = itertools.count()
+
+            async def cliente():
+                while True:
+                    n = next(counter)
+                    scheduled_at = max(time.monotonic(), start + n * interval)
+                    if scheduled_at >= deadline:
+                        return
+                    await asyncio.sleep(scheduled_at - time.monotonic())
+                    await una_peticion(session, time.monotonic())
+
+            await asyncio.gather(*(cliente() for _ in range(concurrency)))
+
+    elapsed = time.monotonic() - start
+    completed = sum(status_counts.values())
+    failed = sum(c for s, c in status_counts.items() if s >= 400) + sum(errors.values())
+    total = completed + sum(errors.values())
+    ordered = sorted(latencies)
+    return {
+        "mode": loop_mode,
+        "concurrency": concurrency,
+        "target_rate": rate,
+        "compression": compress,
+        "duration_s": round(elapsed, 3),
+        "requests": total,
+        "succeeded": total - failed,
+        "failed": failed,
+        "dropped": dropped,
+        "error_rate": round(failed / total, 4) if total else 0.0,
+        "throughput_rps": round(completed / elapsed, 2) if elapsed > 0 else 0.0,
+        "status_codes": {str(k): v for k, v in sorted(status_counts.items())},
+        "errors": errors,
+        "latency_ms": {
+            "p50": round(percentile(ordered, 50) * 1000, 2),
+            "p90": round(percentile(ordered, 90) * 1000, 2),
+            "p99": round(percentile(ordered, 99) * 1000, 2),
+            "max": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+        },
+    }
+
+
+def mostrar_reporte(report: dict):
+    print("\n=== Resultado de la prueba de carga ===")
+    print(f"Modo             : {report['mode']} (concurrencia {report['concurrency']}, "
+          f"tasa objetivo {report['target_rate'] or 'sin límite'} req/s)")
+    print(f"Duración         : {report['duration_s']} s")
+    print(f"Peticiones       : {report['requests']} ({report['succeeded']} ok, {report['failed']} con error, "
+          f"{report['dropped']} descartadas)")
+    print(f"Throughput       : {report['throughput_rps']} req/s")
+    print(f"Tasa de error    : {report['error_rate'] * 100:.2f} %")
+    print(f"Códigos HTTP     : {report['status_codes']}")
+    if report["errors"]:
+        print(f"Errores de red   : {report['errors']}")
+    lat = report["latency_ms"]
+    print(f"Latencia (ms)    : p50={lat['p50']} p90={lat['p90']} p99={lat['p99']} max={lat['max']}")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Cliente de prueba para el sistema de Scraping Distribuido."
@@ -109,10 +312,82 @@ def main():
         default=DEFAULT_TIMEOUT,
         help=f"Timeout total en segundos (default: {DEFAULT_TIMEOUT})",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Recibir la respuesta por partes (NDJSON): scraping primero, procesamiento después",
+    )
+
+    # Modo carga
+    load = parser.add_argument_group("modo carga")
+    load.add_argument(
+        "--load",
+        action="store_true",
+        help="Generar carga concurrente y reportar throughput, errores y percentiles de latencia",
+    )
+    load.add_argument(
+        "--urls-file",
+        help="Archivo con una URL por línea (se recorren en ciclo; default: solo la URL posicional)",
+    )
+    load.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_LOAD_CONCURRENCY,
+        help=f"Clientes simultáneos (closed) o máximo en vuelo (open) (default: {DEFAULT_LOAD_CONCURRENCY})",
+    )
+    load.add_argument(
+        "--rate",
+        type=float,
+        default=0,
+        help="Peticiones por segundo (obligatorio en open; en closed 0 = sin límite)",
+    )
+    load.add_argument(
+        "--duration",
+        type=float,
+        default=DEFAULT_LOAD_DURATION,
+        help=f"Duración de la prueba en segundos (default: {DEFAULT_LOAD_DURATION})",
+    )
+    load.add_argument(
+        "--loop",
+        choices=("closed", "open"),
+        default="closed",
+        help="closed: cada cliente espera su respuesta; open: tasa fija sin esperar (default: closed)",
+    )
+    load.add_argument(
+        "--no-compress",
+        action="store_true",
+        help="Pedir las respuestas sin comprimir (Accept-Encoding: identity)",
+    )
+    load.add_argument(
+        "--json",
+        dest="json_out",
+        help="Guardar el reporte como JSON en este archivo ('-' para stdout)",
+    )
 
     args = parser.parse_args()
     try:
-        asyncio.run(solicitar_scrape(args.url, args.host, args.port, args.timeout))
+        if args.load:
+            if args.loop == "open" and args.rate <= 0:
+                parser.error("--loop open requiere --rate > 0")
+            urls = leer_urls(args.urls_file) if args.urls_file else [args.url]
+            if not urls:
+                parser.error("El archivo de URLs está vacío")
+            report = asyncio.run(ejecutar_carga(
+                urls, args.host, args.port, args.timeout, max(1, args.concurrency),
+                args.duration, args.rate, args.loop, compress=not args.no_compress,
+            ))
+            if args.json_out == "-":
+                print(json.dumps(report, indent=4))
+            else:
+                mostrar_reporte(report)
+                if args.json_out:
+                    with open(args.json_out, "w", encoding="utf-8") as f:
+                        json.dump(report, f, indent=4)
+                    print(f"\n[INFO] Reporte guardado en {args.json_out}")
+        elif args.stream:
+            asyncio.run(solicitar_scrape_stream(args.url, args.host, args.port, args.timeout))
+        else:
+            asyncio.run(solicitar_scrape(args.url, args.host, args.port, args.timeout))
     except KeyboardInterrupt:
         sys.exit(0)
 
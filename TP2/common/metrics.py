@@ -0,0 +1,197 @@
+import bisect
+import json
+import os
+import tempfile
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Límites de los buckets de latencia (segundos)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+# Muestras recientes usadas para calcular p50/p95/p99
+QUANTILE_WINDOW = 2048
+QUANTILES = (0.5, 0.95, 0.99)
+
+Labels = Tuple[Tuple[str, str], ...]
+# Familia ya renderizada: nombre completo -> (tipo, ayuda, líneas de muestras)
+Families = Dict[str, Tuple[str, str, List[str]]]
+
+@contextmanager
+def stage_timer(timings: Dict[str, float], stage: str):
+    """Mide la duración de un bloque y la guarda en timings[stage] (segundos)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = time.perf_counter() - start
+
+class Histogram:
+    """Histograma de latencias: buckets acumulados, suma, cuenta y cuantiles recientes."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1) # El último es +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._recent = deque(maxlen=QUANTILE_WINDOW)
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self._recent.append(value)
+
+    def quantile(self, q: float) -> float:
+        if not self._recent:
+            return 0.0
+        ordered = sorted(self._recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class MetricsRegistry:
+    """
+    Registro de métricas de un proceso (contadores, gauges e histogramas)
+    que se publica en formato texto estilo Prometheus.
+
+    'const_labels' se agregan a todas las series (p. ej. worker="0" en modo
+    prefork, para que las series de cada proceso no se mezclen).
+    """
+
+    def __init__(self, prefix: str = "tp2", const_labels: Optional[Dict[str, str]] = None):
+        self.prefix = prefix
+        self.const_labels: Labels = tuple(sorted((const_labels or {}).items()))
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._gauges: Dict[str, Callable[[], Dict[Labels, float]]] = {}
+        self._help: Dict[str, str] = {}
+
+    @staticmethod
+    def _labels(labels: Optional[Dict[str, str]]) -> Labels:
+        return tuple(sorted((labels or {}).items()))
+
+    def inc(self, name: str, value: float = 1, labels: Optional[Dict[str, str]] = None):
+        key = (name, self._labels(labels))
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        key = (name, self._labels(labels))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram()
+        histogram.observe(value)
+
+    def observe_timings(self, name: str, timings: Dict[str, float], **extra_labels: str):
+        """Registra un dict {etapa: segundos} en el histograma 'name' con label 'stage'."""
+        for stage, seconds in timings.items():
+            if isinstance(seconds, (int, float)):
+                self.observe(name, seconds, {"stage": stage, **extra_labels})
+
+    def gauge(self, name: str, callback: Callable[[], Dict[Labels, float]], help_text: str = ""):
+        """Registra un gauge cuyo valor se lee al publicar (callback -> {labels: valor})."""
+        self._gauges[name] = callback
+        if help_text:
+            self._help[name] = help_text
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    # --- Exposición en texto ---
+
+    def _name(self, name: str) -> str:
+        return f"{self.prefix}_{name}"
+
+    def _fmt_labels(self, labels: Labels, extra: Labels = ()) -> str:
+        items = self.const_labels + labels + extra
+        if not items:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+    def families(self) -> Families:
+        """Todas las métricas renderizadas, agrupadas por familia."""
+        families: Families = {}
+
+        def family(name: str, kind: str) -> List[str]:
+            full = self._name(name)
+            families[full] = (kind, self._help.get(name, ""), [])
+            return families[full][2]
+
+        for name in sorted({n for n, _ in self._counters}):
+            lines = family(name, "counter")
+            for (n, labels), value in sorted(self._counters.items()):
+                if n == name:
+                    lines.append(f"{self._name(name)}{self._fmt_labels(labels)} {value:g}")
+
+        for name, callback in sorted(self._gauges.items()):
+            lines = family(name, "gauge")
+            for labels, value in callback().items():
+                lines.append(f"{self._name(name)}{self._fmt_labels(labels)} {value:g}")
+
+        for name in sorted({n for n, _ in self._histograms}):
+            lines = family(name, "histogram")
+            full = self._name(name)
+            for (n, labels), hist in sorted(self._histograms.items()):
+                if n != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(hist.buckets + (float("inf"),), hist.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{full}_bucket{self._fmt_labels(labels, (('le', le),))} {cumulative}")
+                lines.append(f"{full}_sum{self._fmt_labels(labels)} {hist.sum:.6f}")
+                lines.append(f"{full}_count{self._fmt_labels(labels)} {hist.count}")
+
+            # p50/p95/p99 sobre las muestras recientes, como familia aparte
+            families[f"{full}_quantile"] = ("gauge", "", [])
+            lines = families[f"{full}_quantile"][2]
+            for (n, labels), hist in sorted(self._histograms.items()):
+                if n != name:
+                    continue
+                for q in QUANTILES:
+                    lines.append(
+                        f"{full}_quantile{self._fmt_labels(labels, (('quantile', f'{q:g}'),))} {hist.quantile(q):.6f}"
+                    )
+
+        return families
+
+    def render(self, others: Iterable[Families] = ()) -> str:
+        """
+        Texto de las métricas del proceso. 'others' son familias de otros
+        procesos (modo prefork): se agregan bajo un único HELP/TYPE por familia.
+        """
+        merged: Families = {}
+        for families in (self.families(), *others):
+            for full, (kind, help_text, samples) in families.items():
+                if full not in merged:
+                    merged[full] = (kind, help_text, [])
+                merged[full][2].extend(samples)
+
+        lines = []
+        for full, (kind, help_text, samples) in merged.items():
+            if help_text:
+                lines.append(f"# HELP {full} {help_text}")
+            lines.append(f"# TYPE {full} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+# --- Snapshots compartidos entre procesos (modo prefork) ---
+
+def write_snapshot(directory: str, name: str, families: Families):
+    """Guarda las familias de un proceso en 'directory' (escritura atómica)."""
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(families, f)
+    os.replace(tmp, os.path.join(directory, f"{name}.json"))
+
+def read_snapshots(directory: str, exclude: str = None) -> List[Families]:
+    """Lee los snapshots de los demás procesos (se ignoran los ilegibles)."""
+    snapshots = []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".json") or filename == f"{exclude}.json":
+            continue
+        try:
+            with open(os.path.join(directory, filename), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        snapshots.append({full: (kind, help_text, samples) for full, (kind, help_text, samples) in data.items()})
+    return snapshots
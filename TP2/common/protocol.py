@@ -2,53 +2,190 @@ import json
 import struct
 import logging
 
-# Usamos 'Big-Endian' (network byte order) para el unsigned int de 4 bytes
-_HEADER = struct.Struct('!I')
-HEADER_SIZE = _HEADER.size
+# Formato de un mensaje (todo en 'Big-Endian', network byte order):
+#   [4 bytes: largo del header JSON][2 bytes: cantidad de adjuntos N]
+#   [N x 4 bytes: largo de cada adjunto][header JSON][adjunto 0]...[adjunto N-1]
+# Los adjuntos son bytes crudos (screenshots, thumbnails): viajan sin Base64.
+_PREFIX = struct.Struct('!IH')
+_LENGTH = struct.Struct('!I')
+PREFIX_SIZE = _PREFIX.size
+MAX_ATTACHMENTS = 0xFFFF
+
+# En el header JSON, cada adjunto se reemplaza por {"$att": índice}
+ATTACHMENT_REF = "$att"
 
 log = logging.getLogger(__name__)
 
+class ConnectionClosed(ConnectionError):
+    """El otro extremo cerró la conexión limpiamente entre dos mensajes."""
+
+def _is_binary(value) -> bool:
+    return isinstance(value, (bytes, bytearray, memoryview))
+
+def split_attachments(data):
+    """
+    Separa los valores binarios de 'data'. Devuelve (header, adjuntos):
+    el header es una copia de 'data' donde cada valor bytes/memoryview se
+    reemplazó por una referencia {"$att": i} al adjunto i.
+    """
+    attachments = []
+
+    def walk(value):
+        if _is_binary(value):
+            attachments.append(value)
+            return {ATTACHMENT_REF: len(attachments) - 1}
+        if isinstance(value, dict):
+            return {k: walk(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [walk(v) for v in value]
+        return value
+
+    return walk(data), attachments
+
+def join_attachments(header, attachments: list):
+    """Inverso de split_attachments: reemplaza cada referencia por su adjunto."""
+    def walk(value):
+        if isinstance(value, dict):
+            if len(value) == 1 and isinstance(value.get(ATTACHMENT_REF), int):
+                return attachments[value[ATTACHMENT_REF]]
+            return {k: walk(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [walk(v) for v in value]
+        return value
+
+    if not attachments:
+        return header
+    return walk(header)
+
+def pack_frame(data: dict) -> list:
+    """
+    Arma un mensaje como lista de buffers [prefijo, header JSON, adjuntos...],
+    lista para enviarse con sendmsg / writelines sin concatenar los adjuntos.
+    """
+    header, attachments = split_attachments(data)
+    if len(attachments) > MAX_ATTACHMENTS:
+        raise ValueError(f"Demasiados adjuntos en un mensaje: {len(attachments)}")
+
+    payload = json.dumps(header).encode('utf-8')
+    attachments = [memoryview(a).cast('B') for a in attachments]
+    prefix = _PREFIX.pack(len(payload), len(attachments)) + b"".join(
+        _LENGTH.pack(len(a)) for a in attachments
+    )
+    return [prefix, payload, *attachments]
+
 def pack_message(data: dict) -> bytes:
-    """Serializa un dict a JSON y le prefija 4 bytes de longitud."""
+    """Serializa un dict (con sus adjuntos binarios) a un mensaje completo."""
     try:
-        payload = json.dumps(data).encode('utf-8')
-        header = _HEADER.pack(len(payload))
-        return header + payload
+        return b"".join(pack_frame(data))
     except Exception as e:
         log.error(f"Error al empaquetar mensaje: {e}")
         return b""
 
+def unpack_message(data) -> dict:
+    """
+    Inverso de pack_message: decodifica un mensaje completo que ya está en
+    memoria (p. ej. leído de disco). Los adjuntos son memoryviews sobre 'data'.
+    """
+    view = memoryview(data)
+    header_len, count = _PREFIX.unpack_from(view)
+    pos = PREFIX_SIZE
+    lengths = _unpack_lengths(view[pos:], count)
+    pos += count * _LENGTH.size
+    header = json.loads(bytes(view[pos:pos + header_len]).decode('utf-8'))
+    pos += header_len
+    return join_attachments(header, _slice_attachments(view[pos:], lengths))
+
+def send_message(sock, data: dict):
+    """
+    Envía un mensaje por un socket bloqueante con sendmsg (scatter-gather):
+    los adjuntos se escriben directo desde sus buffers, sin copiarlos.
+    """
+    buffers = [memoryview(b) for b in pack_frame(data) if len(b)]
+    while buffers:
+        sent = sock.sendmsg(buffers)
+        # Envío parcial: se descartan los buffers ya escritos
+        while sent:
+            if sent >= len(buffers[0]):
+                sent -= len(buffers.pop(0))
+            else:
+                buffers[0] = buffers[0][sent:]
+                sent = 0
+
+def read_into(sock, n: int) -> bytearray:
+    """
+    Función de ayuda bloqueante para leer exactamente 'n' bytes de un socket
+    directamente en un buffer preasignado (recv_into, sin concatenar chunks).
+    """
+    buf = bytearray(n)
+    view = memoryview(buf)
+    pos = 0
+    while pos < n:
+        received = sock.recv_into(view[pos:])
+        if not received:
+            raise ConnectionError("Socket cerrado inesperadamente al leer")
+        pos += received
+    return buf
+
 def read_exact(sock, n: int) -> bytes:
     """
     Función de ayuda bloqueante para leer exactamente 'n' bytes de un socket.
     Usado por el Servidor B (socketserver síncrono).
     """
-    buf = bytearray()
-    while len(buf) < n:
-        chunk = sock.recv(n - len(buf))
-        if not chunk:
-            raise ConnectionError("Socket cerrado inesperadamente al leer")
-        buf.extend(chunk)
-    return bytes(buf)
+    return bytes(read_into(sock, n))
+
+def _unpack_lengths(data: bytes, count: int) -> list:
+    return [_LENGTH.unpack_from(data, i * _LENGTH.size)[0] for i in range(count)]
+
+def _slice_attachments(body, lengths: list) -> list:
+    """Corta el bloque de adjuntos en memoryviews (sin copiar)."""
+    view = memoryview(body)
+    attachments = []
+    pos = 0
+    for length in lengths:
+        attachments.append(view[pos:pos + length])
+        pos += length
+    return attachments
 
 def recv_message(sock) -> dict:
     """
-    Recibe un mensaje completo (header + payload) de un socket bloqueante.
+    Recibe un mensaje completo de un socket bloqueante.
+    Los adjuntos se devuelven como memoryviews sobre un único buffer.
     """
     try:
-        # 1. Leer Header
-        header_bytes = read_exact(sock, HEADER_SIZE)
-        (msg_len,) = _HEADER.unpack(header_bytes)
-        
-        # 2. Leer Payload
-        payload_bytes = read_exact(sock, msg_len)
-        
-        # 3. Deserializar
-        return json.loads(payload_bytes.decode('utf-8'))
-        
+        # 1. Leer prefijo (un EOF antes del primer byte es un cierre normal)
+        first = sock.recv(1)
+        if not first:
+            raise ConnectionClosed("Conexión cerrada por el otro extremo")
+        prefix = first + read_exact(sock, PREFIX_SIZE - 1)
+        header_len, count = _PREFIX.unpack(prefix)
+        lengths = _unpack_lengths(read_exact(sock, count * _LENGTH.size), count)
+
+        # 2. Leer header JSON y adjuntos
+        header = json.loads(read_exact(sock, header_len).decode('utf-8'))
+        attachments = _slice_attachments(read_into(sock, sum(lengths)), lengths)
+
+        # 3. Reubicar los adjuntos en el dict
+        return join_attachments(header, attachments)
+
+    except ConnectionClosed:
+        raise
     except (struct.error, json.JSONDecodeError, ConnectionError) as e:
         log.error(f"Error al recibir/decodificar mensaje: {e}")
         raise ConnectionError("Fallo en el protocolo de recepción") from e
     except Exception as e:
         log.error(f"Error inesperado en recv_message: {e}")
-        raise e
\ No newline at end of file
+        raise e
+
+async def read_message_async(reader) -> dict:
+    """
+    Recibe un mensaje completo de un asyncio.StreamReader.
+    Usado por el Servidor A (asyncio). Lanza asyncio.IncompleteReadError si
+    la conexión se cierra a mitad de mensaje.
+    """
+    prefix = await reader.readexactly(PREFIX_SIZE)
+    header_len, count = _PREFIX.unpack(prefix)
+    lengths = _unpack_lengths(await reader.readexactly(count * _LENGTH.size), count)
+
+    header = json.loads((await reader.readexactly(header_len)).decode('utf-8'))
+    attachments = _slice_attachments(await reader.readexactly(sum(lengths)), lengths)
+    return join_attachments(header, attachments)
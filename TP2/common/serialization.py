@@ -1,9 +1,38 @@
+import base64
 import json
 
-def serialize_data(data: dict) -> bytes:
-    """Serializa un diccionario a bytes usando JSON."""
-    return json.dumps(data).encode('utf-8')
+try:
+    import orjson # Opcional: backend JSON más rápido si está instalado
+except ImportError:
+    orjson = None
+
+def _encode_binary(value):
+    """
+    Los adjuntos binarios (screenshots, thumbnails) viajan crudos entre
+    servidores y recién se pasan a Base64 al serializar la respuesta HTTP.
+    """
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(value).decode('ascii')
+    raise TypeError(f"Tipo no serializable a JSON: {type(value).__name__}")
+
+def serialize_data(data: dict, pretty: bool = False) -> bytes:
+    """
+    Serializa un diccionario a bytes usando JSON.
+    Por defecto es compacto (sin espacios) y usa orjson si está disponible;
+    'pretty' indenta con 4 espacios usando json estándar. Los valores
+    binarios se codifican en Base64.
+    """
+    if pretty:
+        return json.dumps(data, indent=4, default=_encode_binary).encode('utf-8')
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=_encode_binary)
+        except TypeError:
+            pass # Tipos que orjson no soporta: se usa json estándar
+    return json.dumps(data, separators=(',', ':'), default=_encode_binary).encode('utf-8')
 
 def deserialize_data(data_bytes: bytes) -> dict:
     """Deserializa bytes a un diccionario Python."""
-    return json.loads(data_bytes.decode('utf-8'))
\ No newline at end of file
+    if orjson is not None:
+        return orjson.loads(data_bytes)
+    return json.loads(data_bytes.decode('utf-8'))
@@ -0,0 +1,148 @@
+import logging
+import multiprocessing.util
+import os
+import time
+from typing import Optional
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import InvalidSessionIdException, WebDriverException
+
+log = logging.getLogger(__name__)
+
+# Cantidad de trabajos tras la cual se recicla el navegador (evita fugas de memoria de Chrome)
+DEFAULT_MAX_JOBS_PER_BROWSER = 50
+PAGE_LOAD_TIMEOUT = 30
+
+# Estado del proceso worker: cada proceso del ProcessPoolExecutor tiene su propio navegador
+_driver: Optional[webdriver.Chrome] = None
+_jobs_done = 0
+_max_jobs = DEFAULT_MAX_JOBS_PER_BROWSER
+
+def build_options() -> Options:
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--window-size=1280,720")
+    return chrome_options
+
+def _start_driver() -> webdriver.Chrome:
+    global _driver, _jobs_done
+    start = time.perf_counter()
+    _driver = webdriver.Chrome(options=build_options())
+    _driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+    _jobs_done = 0
+    log.info(f"[PID {os.getpid()}] Navegador iniciado en {time.perf_counter() - start:.2f}s.")
+    return _driver
+
+def _quit_driver():
+    global _driver
+    if _driver is None:
+        return
+    try:
+        _driver.quit()
+    except Exception as e:
+        log.warning(f"[PID {os.getpid()}] Error cerrando el navegador: {e}")
+    _driver = None
+
+def init_worker(max_jobs: int = DEFAULT_MAX_JOBS_PER_BROWSER):
+    """
+    Inicializador del ProcessPoolExecutor: abre el navegador del proceso
+    apenas arranca, así el primer trabajo no paga el inicio de Chrome.
+    Un fallo acá no tira abajo el pool: se reintenta en el primer trabajo.
+    """
+    global _max_jobs
+    _max_jobs = max(1, max_jobs)
+    # Los workers terminan sin correr atexit; Finalize sí se ejecuta al salir
+    multiprocessing.util.Finalize(None, _quit_driver, exitpriority=10)
+    try:
+        _start_driver()
+    except Exception as e:
+        log.error(f"[PID {os.getpid()}] No se pudo iniciar el navegador al arrancar: {e}")
+
+def warm_up() -> int:
+    """Trabajo vacío para forzar el arranque de un worker (y de su navegador)."""
+    time.sleep(0.5) # Da tiempo a que los demás trabajos de warm-up caigan en otros procesos
+    return os.getpid()
+
+def acquire() -> webdriver.Chrome:
+    """Devuelve el navegador del proceso, iniciándolo si no hay uno vivo."""
+    if _driver is None:
+        return _start_driver()
+    return _driver
+
+# Orígenes que tocó la página: el documento y todo lo que cargó (iframes incluidos)
+_PAGE_ORIGINS_JS = """
+const origins = new Set([location.origin]);
+for (const entry of performance.getEntriesByType('resource')) {
+    try { origins.add(new URL(entry.name).origin); } catch (e) {}
+}
+return Array.from(origins);
+"""
+
+def _page_origins(driver: webdriver.Chrome) -> set:
+    origins = driver.execute_script(_PAGE_ORIGINS_JS) or []
+    return {o for o in origins if o.startswith(("http://", "https://"))}
+
+def _cdp(driver: webdriver.Chrome, cmd: str, params: dict):
+    """Ejecuta un comando CDP; si falla, el error dice cuál fue (y el navegador se recicla)."""
+    try:
+        driver.execute_cdp_cmd(cmd, params)
+    except WebDriverException as e:
+        target = f" ({params['origin']})" if "origin" in params else ""
+        raise WebDriverException(f"{cmd}{target} falló: {e.msg}") from e
+
+def _reset(driver: webdriver.Chrome):
+    """
+    Deja el navegador limpio para el próximo trabajo:
+      * junta los orígenes que tocaron las pestañas abiertas (documento,
+        iframes y demás recursos, vía la Resource Timing API);
+      * abre una pestaña nueva (sessionStorage vacío) y cierra las demás;
+      * borra todas las cookies y la cache del navegador, y el storage
+        (localStorage, IndexedDB, service workers, etc.) de cada origen.
+    Si algún paso falla se lanza WebDriverException y release() recicla el navegador.
+    """
+    origins = set()
+    for handle in driver.window_handles:
+        driver.switch_to.window(handle)
+        origins |= _page_origins(driver)
+
+    old_handles = driver.window_handles
+    driver.switch_to.new_window('tab')
+    fresh = driver.current_window_handle
+    for handle in old_handles:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(fresh)
+
+    # Cookies y cache son de todo el navegador (también las de terceros)
+    _cdp(driver, "Network.clearBrowserCookies", {})
+    _cdp(driver, "Network.clearBrowserCache", {})
+    for origin in sorted(origins):
+        _cdp(driver, "Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+
+def release(driver: webdriver.Chrome, healthy: bool = True):
+    """
+    Devuelve el navegador al terminar un trabajo. Se recicla (se cierra y
+    el próximo trabajo abre uno nuevo) si el trabajo lo dejó roto, si no
+    se pudo limpiar o si ya atendió max_jobs trabajos.
+    """
+    global _jobs_done
+    _jobs_done += 1
+    if healthy and _jobs_done < _max_jobs:
+        try:
+            _reset(driver)
+            return
+        except WebDriverException as e:
+            log.warning(f"[PID {os.getpid()}] No se pudo limpiar el navegador, se recicla: {e}")
+    else:
+        reason = "falló" if not healthy else f"atendió {_jobs_done} trabajos"
+        log.info(f"[PID {os.getpid()}] Reciclando navegador ({reason}).")
+    _quit_driver()
+
+def is_crash(error: Exception) -> bool:
+    """True si el error indica que el navegador murió (no solo que la página falló)."""
+    if isinstance(error, InvalidSessionIdException):
+        return True
+    message = str(error).lower()
+    return any(s in message for s in ("session deleted", "chrome not reachable", "disconnected", "crashed"))
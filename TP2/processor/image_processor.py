@@ -1,61 +1,256 @@
 from PIL import Image
-import requests
+import aiohttp
+import asyncio
 import io
-import base64
-from typing import List, Dict
+import multiprocessing.util
+import os
+from typing import List, Optional
 import logging
 
+from processor.thumbnail_cache import ThumbnailCache, content_digest
+
 log = logging.getLogger(__name__)
 
 # Definición del tamaño del thumbnail requerido
 THUMBNAIL_SIZE = (150, 150)
 MAX_IMAGES_TO_PROCESS = 5 # Límite para evitar sobrecarga
 
-def generate_thumbnail_b64(image_data: bytes) -> str:
+# Formato de salida de los thumbnails (nombre en la CLI -> formato de Pillow)
+THUMBNAIL_FORMATS = {"webp": "WEBP", "jpeg": "JPEG", "png": "PNG"}
+DEFAULT_THUMBNAIL_FORMAT = "png" # Lo que los clientes reciben desde siempre; WebP/JPEG son opt-in
+DEFAULT_THUMBNAIL_QUALITY = 80 # WebP/JPEG (PNG es sin pérdida)
+# thumbnail() reduce primero por un factor entero (rápido) hasta quedar a
+# REDUCING_GAP veces el tamaño final, y de ahí remuestrea con BICUBIC
+REDUCING_GAP = 2.0
+
+# Descargas de imágenes (por proceso del pool de imágenes)
+DEFAULT_DOWNLOAD_CONCURRENCY = 8 # Descargas simultáneas
+DEFAULT_IMAGE_TIMEOUT = 10 # Segundos por imagen (descarga + thumbnail)
+CONNECTIONS_PER_HOST = 4 # Conexiones keep-alive por host
+KEEPALIVE_SECONDS = 30
+MAX_IMAGE_BYTES = 10 * 1024 * 1024 # Imágenes más grandes se descartan
+READ_CHUNK_SIZE = 64 * 1024
+USER_AGENT = "Mozilla/5.0 (compatible; TP2-Scraper/1.0)"
+
+# Estado del proceso worker: cada proceso tiene su event loop y su sesión HTTP,
+# que se reutilizan entre trabajos (así las conexiones keep-alive sobreviven)
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_session: Optional[aiohttp.ClientSession] = None
+_concurrency = DEFAULT_DOWNLOAD_CONCURRENCY
+_timeout = DEFAULT_IMAGE_TIMEOUT
+_cache: Optional[ThumbnailCache] = None
+_format = DEFAULT_THUMBNAIL_FORMAT
+_quality = DEFAULT_THUMBNAIL_QUALITY
+
+def _prepare_mode(img: Image.Image, pil_format: str) -> Image.Image:
+    """Lleva la imagen a un modo que el formato de salida acepte."""
+    has_alpha = img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+    if pil_format == "JPEG":
+        if has_alpha:
+            # JPEG no tiene transparencia: se compone sobre fondo blanco
+            rgba = img.convert("RGBA")
+            background = Image.new("RGB", rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.getchannel("A"))
+            return background
+        return img if img.mode in ("RGB", "L") else img.convert("RGB")
+    if pil_format == "WEBP":
+        if has_alpha:
+            return img if img.mode == "RGBA" else img.convert("RGBA")
+        return img if img.mode == "RGB" else img.convert("RGB")
+    if img.mode in ("1", "L", "LA", "P", "RGB", "RGBA"):
+        return img
+    return img.convert("RGBA" if has_alpha else "RGB") # PNG no acepta CMYK, YCbCr, etc.
+
+def decode_thumbnail(image_data: bytes) -> Image.Image:
+    """
+    Decodifica una imagen directamente al tamaño del thumbnail.
+
+    thumbnail() ya pide a libjpeg un draft (escala 1/2, 1/4 u 1/8 al
+    decodificar), así una foto grande nunca se decodifica completa; después
+    reduce por un factor entero hasta quedar a REDUCING_GAP veces el tamaño
+    final y recién ahí remuestrea.
+    """
+    img = Image.open(io.BytesIO(image_data))
+    if img.mode in ("P", "1"):
+        # Con paleta, Pillow achica con NEAREST: se pasa a color antes
+        img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+    img.thumbnail(THUMBNAIL_SIZE, reducing_gap=REDUCING_GAP)
+    return img
+
+def encode_thumbnail(img: Image.Image, thumb_format: str = None, quality: int = None) -> bytes:
+    """Codifica el thumbnail en el formato configurado (WebP, JPEG o PNG)."""
+    pil_format = THUMBNAIL_FORMATS[thumb_format or _format]
+    quality = quality or _quality
+    img = _prepare_mode(img, pil_format)
+
+    output = io.BytesIO()
+    if pil_format == "WEBP":
+        img.save(output, format="WEBP", quality=quality, method=4)
+    elif pil_format == "JPEG":
+        img.save(output, format="JPEG", quality=quality, optimize=True)
+    else:
+        img.save(output, format="PNG")
+    return output.getvalue()
+
+def generate_thumbnail(image_data: bytes, thumb_format: str = None, quality: int = None) -> bytes:
     """
-    Toma los bytes de una imagen, genera un thumbnail (PNG)
-    y lo devuelve codificado en Base64.
+    Toma los bytes de una imagen, genera un thumbnail
+    y devuelve sus bytes crudos (viajan como adjunto binario hacia A).
     """
     try:
-        img = Image.open(io.BytesIO(image_data))
-        img.thumbnail(THUMBNAIL_SIZE)
-        output = io.BytesIO()
-        img.save(output, format="PNG") # Usamos PNG para thumbnails
-        return base64.b64encode(output.getvalue()).decode('utf-8')
-        
+        return encode_thumbnail(decode_thumbnail(image_data), thumb_format, quality)
+
     except Exception as e:
         log.error(f"Error procesando imagen con Pillow: {e}")
-        return ""
-
-def process_images(image_urls: List[str]) -> List[str]:
-    """
-    Descarga un número limitado de imágenes y genera sus thumbnails.
-    """
-    thumbnail_b64_list = []
-    log.info(f"[Processor] Procesando {len(image_urls)} URLs de imágenes (límite {MAX_IMAGES_TO_PROCESS})...")
-    
-    processed_count = 0
-    for url in image_urls: 
-        if processed_count >= MAX_IMAGES_TO_PROCESS:
-            break
-            
-        if not url.startswith(('http://', 'https://')):
-            continue 
-            
+        return b""
+
+def thumbnail_variant() -> str:
+    """Identifica los parámetros del thumbnail (parte de la clave del cache)."""
+    variant = f"{THUMBNAIL_SIZE[0]}x{THUMBNAIL_SIZE[1]}-{_format}"
+    return variant if _format == "png" else f"{variant}-q{_quality}"
+
+def init_worker(concurrency: int = DEFAULT_DOWNLOAD_CONCURRENCY, timeout: float = DEFAULT_IMAGE_TIMEOUT,
+                cache: Optional[dict] = None, thumb_format: str = DEFAULT_THUMBNAIL_FORMAT,
+                quality: int = DEFAULT_THUMBNAIL_QUALITY):
+    """
+    Inicializador del pool de imágenes: fija la concurrencia de descargas,
+    el deadline por imagen y el formato de los thumbnails, abre el cache de
+    thumbnails ('cache' son los argumentos de ThumbnailCache, None lo
+    desactiva) y registra el cierre de la sesión al salir.
+    """
+    global _concurrency, _timeout, _cache, _format, _quality
+    _concurrency = max(1, concurrency)
+    _timeout = timeout
+    _format = thumb_format
+    _quality = quality
+    if cache is not None:
+        _cache = ThumbnailCache(variant=thumbnail_variant(), **cache)
+    # Los workers terminan sin correr atexit; Finalize sí se ejecuta al salir
+    multiprocessing.util.Finalize(None, _close, exitpriority=10)
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+    return _loop
+
+def _get_session() -> aiohttp.ClientSession:
+    """Sesión HTTP del proceso (se crea dentro del loop, en el primer trabajo)."""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=_concurrency,
+            limit_per_host=CONNECTIONS_PER_HOST,
+            keepalive_timeout=KEEPALIVE_SECONDS,
+            ttl_dns_cache=300,
+        )
+        _session = aiohttp.ClientSession(connector=connector, headers={"User-Agent": USER_AGENT})
+    return _session
+
+def _close():
+    global _session, _loop
+    if _loop is None or _loop.is_closed():
+        return
+    try:
+        if _session is not None and not _session.closed:
+            _loop.run_until_complete(_session.close())
+    except Exception as e:
+        log.warning(f"[PID {os.getpid()}] Error cerrando la sesión HTTP de imágenes: {e}")
+    _session = None
+    _loop.close()
+    _loop = None
+
+async def _download_thumbnail(session: aiohttp.ClientSession, url: str) -> bytes:
+    """Descarga una imagen y genera su thumbnail. Devuelve b"" si no sirve."""
+    async with session.get(url) as response:
+        if response.status != 200 or 'image' not in response.headers.get('Content-Type', ''):
+            return b""
+        if (response.content_length or 0) > MAX_IMAGE_BYTES:
+            log.warning(f"Imagen demasiado grande, se descarta: {url}")
+            return b""
+        # Se lee por chunks con tope: sin Content-Length (chunked) no se sabe el tamaño de antemano
+        body = bytearray()
+        async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+            body.extend(chunk)
+            if len(body) > MAX_IMAGE_BYTES:
+                log.warning(f"Imagen de más de {MAX_IMAGE_BYTES} bytes, se descarta: {url}")
+                return b""
+        data = bytes(body)
+
+    # Pillow corre en un hilo para no frenar las otras descargas
+    return await asyncio.get_running_loop().run_in_executor(None, _thumbnail_for, url, data)
+
+def _thumbnail_for(url: str, data: bytes) -> bytes:
+    """Thumbnail de una imagen descargada, reutilizando uno cacheado si el contenido ya se vio."""
+    if _cache is None:
+        return generate_thumbnail(data)
+
+    digest = content_digest(data)
+    thumb = _cache.get_by_content(url, digest)
+    if thumb is None:
+        thumb = generate_thumbnail(data)
+        if thumb:
+            _cache.put(url, digest, thumb)
+    return thumb
+
+async def _fetch(session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, url: str) -> bytes:
+    # Una URL ya vista no se vuelve a descargar
+    if _cache is not None:
+        thumb = _cache.get_by_url(url)
+        if thumb is not None:
+            return thumb
+
+    async with semaphore:
+        # El deadline corre desde que la descarga empieza, no mientras espera su turno
         try:
-            response = requests.get(url, timeout=10) 
-            
-            if response.status_code == 200 and 'image' in response.headers.get('Content-Type', ''):
-                
-                thumb = generate_thumbnail_b64(response.content)
-                if thumb:
-                    thumbnail_b64_list.append(thumb)
-                    processed_count += 1
-            
-        except requests.exceptions.Timeout:
+            return await asyncio.wait_for(_download_thumbnail(session, url), _timeout)
+        except asyncio.TimeoutError:
             log.warning(f"Timeout al descargar imagen: {url}")
         except Exception as e:
             log.warning(f"Fallo al descargar/procesar {url}: {e}")
-            
-    log.info(f"[Processor] {len(thumbnail_b64_list)} thumbnails generados.")
-    return thumbnail_b64_list
\ No newline at end of file
+        return b""
+
+async def _process_images_async(image_urls: List[str]) -> List[bytes]:
+    session = _get_session()
+    semaphore = asyncio.Semaphore(_concurrency)
+    tasks = [asyncio.ensure_future(_fetch(session, semaphore, url)) for url in image_urls]
+
+    thumbnail_list = []
+    try:
+        # Ganan los primeros MAX_IMAGES_TO_PROCESS thumbnails que terminan bien
+        for next_done in asyncio.as_completed(tasks):
+            thumb = await next_done
+            if thumb:
+                thumbnail_list.append(thumb)
+                if len(thumbnail_list) >= MAX_IMAGES_TO_PROCESS:
+                    break
+    finally:
+        # Las descargas que quedan se cancelan (sus conexiones se cierran)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return thumbnail_list
+
+def process_images(image_urls: List[str]) -> List[bytes]:
+    """
+    Descarga las imágenes de forma concurrente (reutilizando conexiones por
+    host) y devuelve los thumbnails de las primeras MAX_IMAGES_TO_PROCESS
+    que se completan. Cada imagen tiene su propio deadline.
+    """
+    # URLs válidas y sin repetir, en el orden de la página
+    urls = list(dict.fromkeys(u for u in image_urls if u.startswith(('http://', 'https://'))))
+    log.info(f"[Processor] Procesando {len(urls)} URLs de imágenes (límite {MAX_IMAGES_TO_PROCESS}, "
+             f"{_concurrency} descargas simultáneas)...")
+    if not urls:
+        return []
+
+    hits_before = _cache_hits()
+    thumbnail_list = _get_loop().run_until_complete(_process_images_async(urls))
+    log.info(f"[Processor] {len(thumbnail_list)} thumbnails generados "
+             f"({_cache_hits() - hits_before} aciertos de cache).")
+    return thumbnail_list
+
+def _cache_hits() -> int:
+    if _cache is None:
+        return 0
+    return _cache.url_hits + _cache.content_hits
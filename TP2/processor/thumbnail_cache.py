@@ -0,0 +1,252 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+log = logging.getLogger(__name__)
+
+# Valores por defecto del cache de thumbnails del Servidor B
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024 # 32 MB en memoria por proceso (L1)
+DEFAULT_DISK_DIR = os.path.join(tempfile.gettempdir(), "tp2-thumbs") # L2, compartido por los workers
+DEFAULT_DISK_MAX_BYTES = 256 * 1024 * 1024 # 256 MB en disco, compartidos
+DEFAULT_URL_TTL_SECONDS = 3600 # Cuánto se confía en que una URL sigue sirviendo la misma imagen
+MAX_URL_ENTRIES = 10000
+PRUNE_EVERY = 200 # Cada cuántas escrituras a disco se controla su tamaño
+
+def content_digest(data: bytes) -> str:
+    """Hash del contenido de una imagen (clave del cache)."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def _url_digest(url: str) -> str:
+    return hashlib.blake2b(url.strip().encode('utf-8'), digest_size=16).hexdigest()
+
+class ThumbnailCache:
+    """
+    Cache de thumbnails direccionado por contenido.
+
+    Los thumbnails se guardan por hash de los bytes de la imagen original
+    (más 'variant', que identifica tamaño y formato del thumbnail), así la
+    misma imagen servida desde distintas URLs se procesa una sola vez.
+    Aparte se recuerda URL -> hash durante 'url_ttl' segundos: un acierto
+    por URL evita también la descarga.
+
+    Hay dos niveles:
+      * L1, memoria: LRU por bytes, propio de cada proceso del pool (no se
+        comparte; solo evita ir a disco por lo que el proceso ya usó);
+      * L2, disco: un directorio compartido por todos los workers (y que
+        sobrevive a los reinicios), así lo que cachea un worker lo
+        aprovechan los demás. Las escrituras son atómicas (archivo temporal
+        + rename) y, si se supera 'disk_max_bytes', se borran los archivos
+        más viejos. Con disk_dir=None solo queda L1.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, url_ttl: float = DEFAULT_URL_TTL_SECONDS,
+                 disk_dir: Optional[str] = None, disk_max_bytes: int = DEFAULT_DISK_MAX_BYTES,
+                 variant: str = ""):
+        self.max_bytes = max_bytes
+        self.url_ttl = url_ttl
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.variant = variant
+        # Pillow corre en hilos aparte: el cache se usa desde varios hilos
+        self._lock = threading.Lock()
+
+        # clave de contenido -> thumbnail
+        self._thumbs: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        # URL -> (expira_en, hash del contenido)
+        self._urls: "OrderedDict[str, tuple]" = OrderedDict()
+        self._disk_writes = 0
+
+        self.url_hits = 0
+        self.content_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if disk_dir:
+            os.makedirs(os.path.join(disk_dir, "thumbs"), exist_ok=True)
+            os.makedirs(os.path.join(disk_dir, "urls"), exist_ok=True)
+
+    def _key(self, digest: str) -> str:
+        return f"{digest}-{self.variant}" if self.variant else digest
+
+    # --- API ---
+
+    def get_by_url(self, url: str) -> Optional[bytes]:
+        """Thumbnail de una URL ya vista (sin descargarla), o None."""
+        with self._lock:
+            entry = self._urls.get(url)
+            if entry is not None:
+                if entry[0] <= time.time():
+                    del self._urls[url]
+                    entry = None
+                else:
+                    self._urls.move_to_end(url)
+        if entry is None:
+            # El vencimiento no se renueva con los aciertos: pasado url_ttl se descarga de nuevo
+            entry = self._disk_read_url(url)
+            if entry is None:
+                return None
+            self._memory_remember(url, *entry)
+
+        thumb = self._lookup(entry[1])
+        if thumb is not None:
+            self.url_hits += 1
+        return thumb
+
+    def get_by_content(self, url: str, digest: str) -> Optional[bytes]:
+        """Thumbnail de una imagen ya procesada (mismos bytes, quizás otra URL)."""
+        thumb = self._lookup(digest)
+        if thumb is None:
+            self.misses += 1
+            return None
+        self.content_hits += 1
+        self._remember_url(url, digest)
+        return thumb
+
+    def put(self, url: str, digest: str, thumb: bytes):
+        """Guarda un thumbnail recién generado en memoria y, si hay, en disco."""
+        key = self._key(digest)
+        self._memory_put(key, thumb)
+        self._remember_url(url, digest)
+        if self.disk_dir:
+            self._disk_write(self._thumb_path(key), thumb)
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._thumbs),
+            "bytes": self._bytes,
+            "url_hits": self.url_hits,
+            "content_hits": self.content_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    # --- Memoria ---
+
+    def _lookup(self, digest: str) -> Optional[bytes]:
+        key = self._key(digest)
+        with self._lock:
+            thumb = self._thumbs.get(key)
+            if thumb is not None:
+                self._thumbs.move_to_end(key)
+                return thumb
+        if not self.disk_dir:
+            return None
+
+        thumb = self._disk_read(self._thumb_path(key))
+        if thumb is not None:
+            self.disk_hits += 1
+            self._memory_put(key, thumb)
+        return thumb
+
+    def _memory_put(self, key: str, thumb: bytes):
+        if len(thumb) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._thumbs.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._thumbs[key] = thumb
+            self._bytes += len(thumb)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._thumbs.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def _remember_url(self, url: str, digest: str):
+        self._memory_remember(url, time.time() + self.url_ttl, digest)
+        if self.disk_dir:
+            self._disk_write(self._url_path(url), digest.encode('ascii'))
+
+    def _memory_remember(self, url: str, expires_at: float, digest: str):
+        with self._lock:
+            self._urls.pop(url, None)
+            self._urls[url] = (expires_at, digest)
+            while len(self._urls) > MAX_URL_ENTRIES:
+                self._urls.popitem(last=False)
+
+    # --- Disco (compartido entre workers) ---
+
+    def _thumb_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, "thumbs", key[:2], key)
+
+    def _url_path(self, url: str) -> str:
+        digest = _url_digest(url)
+        return os.path.join(self.disk_dir, "urls", digest[:2], digest)
+
+    def _disk_read(self, path: str) -> Optional[bytes]:
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            log.warning(f"No se pudo leer {path} del cache de thumbnails: {e}")
+            return None
+
+    def _disk_read_url(self, url: str) -> Optional[tuple]:
+        """(expira_en, hash) guardado por cualquier worker para la URL, o None."""
+        if not self.disk_dir:
+            return None
+        path = self._url_path(url)
+        try:
+            expires_at = os.path.getmtime(path) + self.url_ttl
+        except OSError:
+            return None
+        if expires_at <= time.time():
+            return None
+        data = self._disk_read(path)
+        return (expires_at, data.decode('ascii')) if data else None
+
+    def _disk_write(self, path: str, data: bytes):
+        # Archivo temporal + rename: otro worker nunca lee un archivo a medias
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            log.warning(f"No se pudo escribir {path} en el cache de thumbnails: {e}")
+            return
+
+        self._disk_writes += 1
+        if self._disk_writes % PRUNE_EVERY == 0:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """Borra los archivos más viejos si el directorio supera disk_max_bytes."""
+        files = []
+        total = 0
+        for root, _, names in os.walk(self.disk_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue # Otro worker lo borró
+                files.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        if total <= self.disk_max_bytes:
+            return
+
+        files.sort()
+        removed = 0
+        for _, size, path in files:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+            total -= size
+        log.info(f"[PID {os.getpid()}] Cache de thumbnails en disco: {removed} archivos eliminados.")
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict
+
+log = logging.getLogger(__name__)
+
+# Valores por defecto del control de admisión
+DEFAULT_MAX_IN_FLIGHT = 64
+DEFAULT_MAX_QUEUE = 128
+
+class Overloaded(Exception):
+    """El servidor está saturado: la cola de espera está llena."""
+
+class AdmissionController:
+    """
+    Control de admisión con descarte de carga (load shedding).
+
+    Deja pasar hasta 'max_in_flight' análisis a la vez; los siguientes
+    esperan en una cola de hasta 'max_queue' lugares. Con la cola llena se
+    rechaza enseguida (Overloaded) en lugar de dejar que la petición espere
+    hasta el timeout. Con max_in_flight <= 0 no hay límite.
+
+    El trabajo ya aceptado (tareas asíncronas, lotes, crawls) entra con
+    shed=False: espera su turno aunque la cola esté llena, porque al
+    cliente ya se le respondió y no tiene a quién devolverle un 503.
+    """
+
+    def __init__(self, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT, max_queue: int = DEFAULT_MAX_QUEUE):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max(0, max_queue)
+        self._semaphore = asyncio.Semaphore(max(1, max_in_flight))
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_waiting_seen = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def admit(self, shed: bool = True):
+        if self.max_in_flight <= 0:
+            yield
+            return
+
+        if not self._semaphore.locked():
+            await self._semaphore.acquire() # Hay lugar: no espera
+        else:
+            if shed and self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise Overloaded(f"Server overloaded ({self.in_flight} in flight, {self.waiting} queued)")
+
+            self.waiting += 1
+            self.max_waiting_seen = max(self.max_waiting_seen, self.waiting)
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self.waiting -= 1
+
+        self.in_flight += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "max_queue_depth_seen": self.max_waiting_seen,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
@@ -1,28 +1,268 @@
 import aiohttp
 import asyncio
+import codecs
+import logging
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, NamedTuple, Optional
+from urllib.parse import urlsplit
 from aiohttp import ClientTimeout
 
+try:
+    import charset_normalizer # Opcional: solo para páginas sin charset declarado
+except ImportError:
+    charset_normalizer = None
+
+log = logging.getLogger(__name__)
+
 # Timeout de 30 segundos
 SCRAPING_TIMEOUT = 30 
 
-async def fetch_url(session: aiohttp.ClientSession, url: str) -> str:
+# Lectura del body
+MAX_BODY_BYTES = 5 * 1024 * 1024 # Tope de bytes a descargar por página
+READ_CHUNK_SIZE = 64 * 1024
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+CHARSET_SNIFF_BYTES = 4096   # Donde se busca <meta charset>
+CHARSET_DETECT_BYTES = 65536 # Bytes usados por la detección de fallback
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+
+# Límites por defecto del scheduler por host
+DEFAULT_HOST_CONCURRENCY = 4   # Conexiones simultáneas por host
+DEFAULT_HOST_RATE = 5.0        # Peticiones por segundo por host
+DEFAULT_GLOBAL_CONCURRENCY = 100
+MAX_TRACKED_HOSTS = 10000      # Se olvidan hosts inactivos por encima de esto
+
+class TokenBucket:
+    """
+    Token bucket asíncrono: permite 'rate' peticiones por segundo con
+    ráfagas de hasta 'burst'. Los que esperan se atienden en orden (FIFO).
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return # Sin límite de tasa
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class _HostState:
+    def __init__(self, concurrency: int, rate: float, burst: float):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate, burst)
+        self.active = 0
+        self.waiting = 0
+        self.requests = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+class HostScheduler:
     """
-    Realiza una petición GET asíncrona a la URL y devuelve el contenido HTML.
-    Maneja el timeout y errores básicos.
+    Scheduler delante de la ClientSession compartida.
+
+    Limita las conexiones simultáneas y la tasa de peticiones por host
+    (token bucket), más un tope global. Las peticiones que exceden el
+    límite esperan en cola (FIFO) en lugar de fallar, y se mide cuánto
+    esperó cada una.
     """
+
+    def __init__(self, host_concurrency: int = DEFAULT_HOST_CONCURRENCY,
+                 host_rate: float = DEFAULT_HOST_RATE,
+                 global_concurrency: int = DEFAULT_GLOBAL_CONCURRENCY,
+                 host_burst: Optional[float] = None):
+        self.host_concurrency = max(1, host_concurrency)
+        self.host_rate = host_rate
+        self.host_burst = host_burst if host_burst is not None else max(1.0, float(self.host_concurrency))
+        self._global = asyncio.Semaphore(max(1, global_concurrency))
+        self._hosts: Dict[str, _HostState] = {}
+
+        self.requests = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _host_state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            if len(self._hosts) >= MAX_TRACKED_HOSTS:
+                self._forget_idle_hosts()
+            state = _HostState(self.host_concurrency, self.host_rate, self.host_burst)
+            self._hosts[host] = state
+        return state
+
+    def _forget_idle_hosts(self):
+        for host in [h for h, st in self._hosts.items() if st.active == 0 and st.waiting == 0]:
+            del self._hosts[host]
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """Reserva un turno para pedir 'url' respetando los límites de su host."""
+        host = (urlsplit(url).netloc or url).lower()
+        state = self._host_state(host)
+        start = time.monotonic()
+
+        state.waiting += 1
+        try:
+            # Primero el límite del host: un host lento no acapara los turnos globales
+            await state.semaphore.acquire()
+        finally:
+            state.waiting -= 1
+        try:
+            await state.bucket.acquire()
+            async with self._global:
+                waited = time.monotonic() - start
+                self._record_wait(state, waited)
+                state.active += 1
+                try:
+                    yield
+                finally:
+                    state.active -= 1
+        finally:
+            state.semaphore.release()
+
+    def _record_wait(self, state: _HostState, waited: float):
+        state.requests += 1
+        state.wait_total += waited
+        state.wait_max = max(state.wait_max, waited)
+        self.requests += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+
+    def stats(self) -> Dict:
+        """Métricas de espera en cola, globales y por host."""
+        return {
+            "requests": self.requests,
+            "queue_wait_avg_ms": round(self.wait_total / self.requests * 1000, 2) if self.requests else 0,
+            "queue_wait_max_ms": round(self.wait_max * 1000, 2),
+            "hosts": {
+                host: {
+                    "active": st.active,
+                    "waiting": st.waiting,
+                    "requests": st.requests,
+                    "queue_wait_avg_ms": round(st.wait_total / st.requests * 1000, 2) if st.requests else 0,
+                    "queue_wait_max_ms": round(st.wait_max * 1000, 2),
+                }
+                for host, st in self._hosts.items()
+            },
+        }
+
+class UnsupportedContentError(Exception):
+    """La URL no devuelve HTML (según su Content-Type)."""
+
+def detect_charset(header_charset: Optional[str], head: bytes) -> str:
+    """
+    Elige el charset para decodificar el body: primero el del header
+    Content-Type, luego <meta charset> (o http-equiv) en los primeros bytes
+    y recién al final una detección sobre el contenido.
+    """
+    candidates = [header_charset]
+    match = _META_CHARSET_RE.search(head[:CHARSET_SNIFF_BYTES])
+    if match:
+        candidates.append(match.group(1).decode('ascii', 'ignore'))
+
+    for charset in candidates:
+        if charset:
+            try:
+                return codecs.lookup(charset).name
+            except LookupError:
+                pass
+
+    # Fallback: UTF-8 si es válido, si no detección estadística
+    try:
+        head.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError as e:
+        if e.start >= len(head) - 3:
+            return 'utf-8' # Solo se cortó un carácter multibyte al final
+    if charset_normalizer is not None:
+        best = charset_normalizer.from_bytes(head[:CHARSET_DETECT_BYTES]).best()
+        if best is not None:
+            return best.encoding
+    return 'latin-1'
+
+class FetchResult(NamedTuple):
+    """Resultado de fetch_page."""
+    html: str             # Vacío si not_modified
+    not_modified: bool    # El servidor respondió 304 a la petición condicional
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+async def fetch_page(session: aiohttp.ClientSession, url: str,
+                     scheduler: Optional[HostScheduler] = None,
+                     max_bytes: int = MAX_BODY_BYTES,
+                     validators: Optional[Dict[str, str]] = None) -> FetchResult:
+    """
+    Realiza una petición GET asíncrona a la URL y devuelve el contenido HTML
+    junto con sus validadores (ETag / Last-Modified).
+    Maneja el timeout y errores básicos. Si se pasa un 'scheduler', la
+    petición espera su turno según los límites del host (la espera no
+    cuenta para el timeout).
+
+    Con 'validators' ({"etag": ..., "last_modified": ...}) la petición es
+    condicional (If-None-Match / If-Modified-Since); si la página no cambió
+    el resultado viene con not_modified=True y sin body.
+
+    El body se lee por chunks hasta 'max_bytes'; si la página es más grande
+    se trunca (el parser tolera HTML incompleto). Si el Content-Type no es
+    HTML se aborta antes de leer el body (UnsupportedContentError).
+    """
+    if scheduler is not None:
+        async with scheduler.slot(url):
+            return await fetch_page(session, url, max_bytes=max_bytes, validators=validators)
+
     timeout_config = ClientTimeout(total=SCRAPING_TIMEOUT)
+
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
     
     try:
-        async with session.get(url, allow_redirects=True, timeout=timeout_config) as response:
+        async with session.get(url, allow_redirects=True, timeout=timeout_config, headers=headers) as response:
             
             # Manejo de códigos de estado HTTP (4xx, 5xx)
             if response.status >= 400:
                 response.raise_for_status()
+
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if response.status == 304:
+                return FetchResult("", True, etag, last_modified)
+
+            # Sin header se intenta igual; con header tiene que ser HTML
+            if 'Content-Type' in response.headers and response.content_type not in HTML_CONTENT_TYPES:
+                raise UnsupportedContentError(
+                    f"Unsupported Content-Type for {url}: {response.content_type}"
+                )
+
+            # Leemos el body por chunks, con tope de bytes
+            body = bytearray()
+            async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+                body.extend(chunk)
+                if len(body) >= max_bytes:
+                    del body[max_bytes:]
+                    log.warning(f"Body de {url} truncado a {max_bytes} bytes.")
+                    break
+
+            charset = detect_charset(response.charset, bytes(body[:CHARSET_DETECT_BYTES]))
+            return FetchResult(body.decode(charset, errors='replace'), False, etag, last_modified)
             
-            # Leemos el contenido como texto (HTML)
-            html_content = await response.text()
-            return html_content
-            
+    except UnsupportedContentError:
+        raise
     except asyncio.TimeoutError:
         # Captura específica del timeout asíncrono
         raise asyncio.TimeoutError(f"Scraping timeout ({SCRAPING_TIMEOUT}s) for {url}")
@@ -30,4 +270,4 @@ async def fetch_url(session: aiohttp.ClientSession, url: str) -> str:
         # Captura otros errores de red o HTTP (conexión rechazada, DNS, etc.)
         raise ConnectionError(f"Network or HTTP error for {url}: {e}")
     except Exception as e:
-        raise Exception(f"Unexpected error during fetch: {e}")
\ No newline at end of file
+        raise Exception(f"Unexpected error during fetch: {e}")
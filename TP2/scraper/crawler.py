@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Tuple
+from urllib.parse import urlsplit
+
+from scraper.result_cache import normalize_url
+
+log = logging.getLogger(__name__)
+
+# Valores por defecto y topes del modo crawl
+DEFAULT_MAX_DEPTH = 2
+DEFAULT_MAX_PAGES = 50
+DEFAULT_CONCURRENCY = 8
+MAX_DEPTH_LIMIT = 10
+MAX_PAGES_LIMIT = 1000
+
+class VisitedSet:
+    """
+    Conjunto compacto de URLs ya vistas: guarda un hash de 64 bits
+    (blake2b) de la URL normalizada en lugar del string completo.
+    Una colisión solo haría saltear una página, con probabilidad despreciable.
+    """
+
+    def __init__(self):
+        self._hashes = set()
+
+    @staticmethod
+    def _key(url: str) -> int:
+        digest = hashlib.blake2b(normalize_url(url).encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big')
+
+    def add(self, url: str) -> bool:
+        """Agrega la URL. Devuelve False si ya estaba."""
+        key = self._key(url)
+        if key in self._hashes:
+            return False
+        self._hashes.add(key)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+class Crawler:
+    """
+    Recorre un sitio a partir de una URL semilla siguiendo los links que
+    devuelve el scraping (BFS con concurrencia acotada).
+
+    'analyze' es la función del pipeline (url -> (http_status, cuerpo)),
+    así cada página pasa por el cache, la descarga y el Servidor B como
+    cualquier otra petición. Se detiene al llegar a 'max_depth' niveles o a
+    'max_pages' páginas; con 'same_domain' solo sigue links del mismo host.
+    """
+
+    def __init__(self, analyze: Callable[[str], Awaitable[Tuple[int, dict]]], seed: str,
+                 max_depth: int = DEFAULT_MAX_DEPTH, max_pages: int = DEFAULT_MAX_PAGES,
+                 same_domain: bool = True, concurrency: int = DEFAULT_CONCURRENCY):
+        self.analyze = analyze
+        self.seed = seed
+        self.max_depth = max(0, max_depth)
+        self.max_pages = max(1, max_pages)
+        self.same_domain = same_domain
+        self.concurrency = max(1, concurrency)
+        self.domain = (urlsplit(seed).hostname or "").lower()
+
+        self._visited = VisitedSet()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._results: asyncio.Queue = asyncio.Queue()
+        self._outstanding = 0 # Páginas encoladas o en análisis
+
+        self.scheduled = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0 # Links descartados por dominio o por el tope de páginas
+        self._start = None
+
+    def _schedule(self, url: str, depth: int):
+        if not self._visited.add(url):
+            return
+        if self.scheduled >= self.max_pages:
+            self.skipped += 1
+            return
+        self.scheduled += 1
+        self._outstanding += 1
+        self._queue.put_nowait((url, depth))
+
+    def _follow(self, body: dict, depth: int):
+        """Encola los links de una página analizada."""
+        if depth >= self.max_depth:
+            return
+        links = (body.get("scraping_data") or {}).get("links") or []
+        for link in links:
+            try:
+                parts = urlsplit(link)
+                if parts.scheme not in ("http", "https"):
+                    continue
+                if self.same_domain and (parts.hostname or "").lower() != self.domain:
+                    self.skipped += 1
+                    continue
+                parts.port # Valida el puerto (p. ej. ':99999' lanza ValueError)
+                self._schedule(link, depth + 1)
+            except ValueError:
+                # Links mal formados de la página: se descartan sin cortar el crawl
+                self.skipped += 1
+
+    async def _worker(self):
+        while True:
+            url, depth = await self._queue.get()
+            try:
+                status, body = await self.analyze(url)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.exception(f"Error no manejado en crawl de {url}")
+                status, body = 500, {"status": "error", "message": f"Analysis failed: {e}"}
+
+            try:
+                if status == 200:
+                    self.succeeded += 1
+                    self._follow(body, depth)
+                else:
+                    self.failed += 1
+            except Exception:
+                log.exception(f"Error siguiendo los links de {url}")
+            finally:
+                # Siempre se descuenta y se entrega la página: si no, run() esperaría para siempre
+                self._outstanding -= 1
+                self._results.put_nowait((depth, url, status, body))
+
+    async def run(self):
+        """
+        Generador asíncrono: entrega (profundidad, url, http_status, cuerpo)
+        a medida que termina cada página.
+        """
+        self._start = time.monotonic()
+        self._schedule(self.seed, 0)
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        try:
+            while self._outstanding or not self._results.empty():
+                yield await self._results.get()
+        finally:
+            # Si el cliente se desconecta se cancelan las páginas pendientes
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    def summary(self) -> Dict:
+        elapsed = time.monotonic() - self._start if self._start else 0.0
+        pages = self.succeeded + self.failed
+        return {
+            "seed": self.seed,
+            "pages": pages,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "discovered": len(self._visited),
+            "skipped": self.skipped,
+            "elapsed_ms": round(elapsed * 1000, 2),
+            "pages_per_second": round(pages / elapsed, 2) if elapsed > 0 else 0.0,
+        }
@@ -0,0 +1,74 @@
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from scraper.result_cache import normalize_url
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024 # 32 MB de HTML
+
+class PageEntry:
+    """HTML descargado de una URL, con sus validadores y el parseo ya hecho."""
+
+    __slots__ = ("html", "etag", "last_modified", "parsed", "size")
+
+    def __init__(self, html: str, etag: Optional[str], last_modified: Optional[str], parsed=None):
+        self.html = html
+        self.etag = etag
+        self.last_modified = last_modified
+        self.parsed = parsed # (scraping_data, image_urls) o None
+        self.size = len(html)
+
+    def validators(self) -> Dict[str, Optional[str]]:
+        return {"etag": self.etag, "last_modified": self.last_modified}
+
+class PageCache:
+    """
+    Cache de páginas para revalidación condicional (ETag / Last-Modified).
+
+    Guarda el body de cada página que vino con validadores, junto con su
+    scraping_data ya parseado. Si el servidor responde 304 se reutilizan
+    ambos sin descargar ni parsear de nuevo. Desalojo LRU por tamaño total.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, PageEntry]" = OrderedDict()
+        self._bytes = 0
+
+        self.revalidated = 0 # Respuestas 304 aprovechadas
+        self.evictions = 0
+
+    def get(self, url: str) -> Optional[PageEntry]:
+        key = normalize_url(url)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, url: str, entry: PageEntry):
+        """Guarda la página si trae validadores y entra en el cache."""
+        if not (entry.etag or entry.last_modified) or entry.size > self.max_bytes:
+            return
+
+        key = normalize_url(url)
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.size
+
+        self._entries[key] = entry
+        self._bytes += entry.size
+
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "revalidated": self.revalidated,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,90 @@
+from html.parser import HTMLParser
+from typing import Dict, List, Tuple
+from urllib.parse import urljoin # Para resolver URLs relativas
+
+from scraper.metadata_extractor import META_TAGS_TO_EXTRACT
+
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+
+class PageExtractor(HTMLParser):
+    """
+    Extractor por eventos: recorre el HTML una sola vez, sin construir un
+    árbol DOM, y junta título, enlaces, imágenes, encabezados y meta tags.
+    """
+
+    def __init__(self, base_url: str):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.title_parts: List[str] = []
+        self.title_seen = False
+        self.in_title = False
+        self.links: List[str] = []
+        self.images_count = 0
+        self.image_urls: List[str] = []
+        self.structure = {tag: 0 for tag in HEADING_TAGS}
+        self.meta_tags: Dict[str, str] = {}
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            attrs = dict(attrs)
+            if 'href' in attrs:
+                href = (attrs['href'] or '').strip()
+                if href:
+                    # Convierte enlaces relativos (ej: /about) a absolutos
+                    self.links.append(urljoin(self.base_url, href))
+
+        elif tag == 'img':
+            attrs = dict(attrs)
+            if 'src' in attrs:
+                self.images_count += 1
+                src = (attrs['src'] or '').strip()
+                if src:
+                    self.image_urls.append(urljoin(self.base_url, src))
+
+        elif tag in self.structure:
+            self.structure[tag] += 1
+
+        elif tag == 'meta':
+            attrs = dict(attrs)
+            key = attrs.get('name') or attrs.get('property')
+            if key in META_TAGS_TO_EXTRACT:
+                content = attrs.get('content')
+                if content:
+                    self.meta_tags[key] = content
+
+        elif tag == 'title' and not self.title_seen:
+            # Solo cuenta el primer <title> del documento
+            self.title_seen = True
+            self.in_title = True
+
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self.in_title = False
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.title_parts.append(data)
+
+    @property
+    def title(self) -> str:
+        title = ''.join(self.title_parts).strip()
+        return title or "No Title Found"
+
+def extract_page(html_content: str, base_url: str) -> Tuple[Dict, Dict]:
+    """
+    Parsea el HTML en una sola pasada y devuelve (contenido, meta tags):
+    título, links, estructura de encabezados, imágenes y los meta tags de
+    META_TAGS_TO_EXTRACT.
+    """
+    extractor = PageExtractor(base_url)
+    extractor.feed(html_content)
+    extractor.close()
+
+    content = {
+        "title": extractor.title,
+        "links": extractor.links,
+        "structure": extractor.structure,
+        "images_count": extractor.images_count,
+        "image_urls": extractor.image_urls # Importante para Servidor B
+    }
+    return content, extractor.meta_tags
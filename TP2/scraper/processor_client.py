@@ -0,0 +1,335 @@
+import asyncio
+import bisect
+import hashlib
+import itertools
+import logging
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from common.protocol import pack_frame, read_message_async
+from scraper.result_cache import normalize_url
+
+log = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT = 10 # Timeout de conexión con el Servidor B
+DEFAULT_POOL_SIZE = 2
+
+# Varios Servidores B
+RING_REPLICAS = 64 # Puntos por backend en el anillo de hashing consistente
+DEFAULT_MAX_PENDING = 32 # Trabajos en vuelo a partir de los cuales un backend se considera saturado
+DEFAULT_BREAKER_FAILURES = 3 # Fallos seguidos que abren el circuito
+DEFAULT_BREAKER_COOLDOWN = 30 # Segundos con el circuito abierto antes de reintentar
+
+class BackendUnavailable(ConnectionError):
+    """No se pudo conectar con el Servidor B (el trabajo no llegó a enviarse)."""
+
+def parse_backend(value: str) -> Tuple[str, int]:
+    """Convierte 'host:port' (o '[ipv6]:port') en (host, port)."""
+    host, sep, port = value.strip().rpartition(":")
+    if not sep or not host or not port.isdigit():
+        raise ValueError(f"Backend inválido (se espera host:port): {value!r}")
+    return host.strip("[]"), int(port)
+
+class ProcessorConnection:
+    """
+    Conexión persistente y multiplexada con el Servidor B.
+
+    Cada trabajo se envía con un 'request_id' propio y la respuesta se
+    asocia por ese ID, así que puede haber muchos trabajos en vuelo sobre
+    el mismo socket y B puede contestarlos en cualquier orden.
+    """
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()
+        self._pending: Dict[int, asyncio.Future] = {}
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def connect(self):
+        log.info(f"Conectando al Servidor B en {self.host}:{self.port}...")
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port),
+            timeout=CONNECT_TIMEOUT
+        )
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+    async def request(self, request_id: int, job: dict, timeout: float) -> dict:
+        """Envía un trabajo y espera la respuesta con su mismo request_id."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            buffers = pack_frame({**job, "request_id": request_id})
+            async with self._write_lock:
+                self._writer.writelines(buffers)
+                await self._writer.drain()
+            return await asyncio.wait_for(future, timeout=timeout)
+        finally:
+            # Si hubo timeout, una respuesta tardía se descarta en _read_loop
+            self._pending.pop(request_id, None)
+
+    async def _read_loop(self):
+        """Lee respuestas del socket y despierta al trabajo correspondiente."""
+        error: Exception = ConnectionError("Conexión con el Servidor B cerrada")
+        try:
+            while True:
+                resp = await read_message_async(self._reader)
+                future = self._pending.get(resp.pop("request_id", None))
+                if future is not None and not future.done():
+                    future.set_result(resp)
+        except asyncio.IncompleteReadError:
+            log.warning(f"Servidor B ({self.host}:{self.port}) cerró la conexión.")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.error(f"Error leyendo del Servidor B: {e}")
+            error = ConnectionError(f"Error leyendo del Servidor B: {e}")
+        finally:
+            # Los trabajos en vuelo no van a recibir respuesta por este socket
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self._pending.clear()
+            if self._writer:
+                self._writer.close()
+
+    async def close(self):
+        if self._reader_task:
+            self._reader_task.cancel()
+        if self._writer:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except Exception:
+                pass
+
+class ProcessorPool:
+    """
+    Pool de conexiones persistentes hacia el Servidor B.
+
+    Cada trabajo va por la conexión con menos trabajos en vuelo. Las
+    conexiones caídas se reabren bajo demanda.
+    """
+
+    def __init__(self, host: str, port: int, size: int = DEFAULT_POOL_SIZE):
+        self.host = host
+        self.port = port
+        self._connections: List[ProcessorConnection] = [
+            ProcessorConnection(host, port) for _ in range(max(1, size))
+        ]
+        self._ids = itertools.count(1)
+        self._connect_lock = asyncio.Lock()
+
+    @property
+    def name(self) -> str:
+        host = f"[{self.host}]" if ":" in self.host else self.host
+        return f"{host}:{self.port}"
+
+    async def _pick(self) -> ProcessorConnection:
+        conn = min(self._connections, key=lambda c: c.pending)
+        if not conn.is_open:
+            async with self._connect_lock:
+                if not conn.is_open:
+                    try:
+                        await conn.connect()
+                    except (OSError, asyncio.TimeoutError) as e:
+                        raise BackendUnavailable(f"No se pudo conectar al Servidor B en {self.name}: {e!r}") from e
+        return conn
+
+    async def request(self, job: dict, timeout: float) -> dict:
+        conn = await self._pick()
+        return await conn.request(next(self._ids), job, timeout)
+
+    def in_flight(self) -> int:
+        return sum(c.pending for c in self._connections)
+
+    async def close(self):
+        for conn in self._connections:
+            await conn.close()
+
+class CircuitBreaker:
+    """
+    Circuit breaker de un backend: tras 'failures' fallos seguidos (timeouts
+    o conexiones caídas) se abre y no recibe trabajos durante 'cooldown'
+    segundos. Pasado ese tiempo deja pasar un único trabajo de prueba: si
+    sale bien se cierra, si falla vuelve a abrirse.
+    """
+
+    def __init__(self, failures: int = DEFAULT_BREAKER_FAILURES, cooldown: float = DEFAULT_BREAKER_COOLDOWN):
+        self.max_failures = max(1, failures)
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self.trips = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def ready(self) -> bool:
+        """True si el backend puede recibir trabajo (sin modificar el estado)."""
+        if self.opened_at is None:
+            return True
+        return not self._probing and time.monotonic() - self.opened_at >= self.cooldown
+
+    def allow(self) -> bool:
+        if not self.ready():
+            return False
+        if self.opened_at is not None:
+            self._probing = True # Semiabierto: un solo trabajo de prueba
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probing or self.failures >= self.max_failures:
+            if self.opened_at is None:
+                self.trips += 1
+                log.warning(f"Circuito abierto tras {self.failures} fallos seguidos.")
+            self.opened_at = time.monotonic()
+            self._probing = False
+
+    def cancel_probe(self):
+        """El trabajo de prueba se canceló sin resultado: se permite otro."""
+        self._probing = False
+
+class HashRing:
+    """Anillo de hashing consistente: cada clave se asigna siempre al mismo backend."""
+
+    def __init__(self, count: int, replicas: int = RING_REPLICAS):
+        points = []
+        for index in range(count):
+            for replica in range(replicas):
+                points.append((self._hash(f"{index}-{replica}"), index))
+        points.sort()
+        self._hashes = [h for h, _ in points]
+        self._owners = [i for _, i in points]
+        self.count = count
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+    def candidates(self, key: str) -> Iterator[int]:
+        """Backends en orden de preferencia para la clave (el dueño primero)."""
+        seen = set()
+        start = bisect.bisect(self._hashes, self._hash(key))
+        for offset in range(len(self._owners)):
+            owner = self._owners[(start + offset) % len(self._owners)]
+            if owner not in seen:
+                seen.add(owner)
+                yield owner
+                if len(seen) == self.count:
+                    return
+
+class ProcessorCluster:
+    """
+    Reparte los trabajos entre varios Servidores B.
+
+    Cada URL se asigna por hashing consistente a un backend, así los caches
+    de ese B se mantienen calientes y agregar o quitar un B solo mueve una
+    parte de las URLs. Si el backend elegido está saturado (max_pending
+    trabajos en vuelo) o con el circuito abierto, se usa el siguiente del
+    anillo; si no se puede conectar, se prueba con el siguiente.
+    """
+
+    def __init__(self, backends: List[Tuple[str, int]], size: int = DEFAULT_POOL_SIZE,
+                 max_pending: int = DEFAULT_MAX_PENDING,
+                 breaker_failures: int = DEFAULT_BREAKER_FAILURES,
+                 breaker_cooldown: float = DEFAULT_BREAKER_COOLDOWN):
+        if not backends:
+            raise ValueError("Se necesita al menos un Servidor B")
+        self.pools = [ProcessorPool(host, port, size=size) for host, port in backends]
+        self.breakers = [CircuitBreaker(breaker_failures, breaker_cooldown) for _ in backends]
+        self.ring = HashRing(len(self.pools))
+        self.max_pending = max_pending
+        self.fallbacks = 0 # Trabajos que no fueron a su backend preferido
+
+    @property
+    def name(self) -> str:
+        return ", ".join(pool.name for pool in self.pools)
+
+    def _route(self, key: str) -> List[int]:
+        """
+        Orden en que se prueban los backends para la clave. Los que tienen el
+        circuito abierto (o ya un trabajo de prueba en curso) no se incluyen.
+        """
+        allowed, saturated = [], []
+        for index in self.ring.candidates(key):
+            if not self.breakers[index].ready():
+                continue
+            if self.max_pending > 0 and self.pools[index].in_flight() >= self.max_pending:
+                saturated.append(index)
+            else:
+                allowed.append(index)
+        # Si todos están saturados, primero el menos cargado
+        saturated.sort(key=lambda i: self.pools[i].in_flight())
+        return allowed + saturated
+
+    async def request(self, job: dict, timeout: float) -> dict:
+        key = normalize_url(job.get("url", ""))
+        order = self._route(key)
+        preferred = next(self.ring.candidates(key))
+        # Con todos los circuitos abiertos se falla enseguida, sin esperar al timeout
+        last_error: Exception = BackendUnavailable("Ningún Servidor B disponible (circuitos abiertos)")
+
+        for index in order:
+            breaker = self.breakers[index]
+            if not breaker.allow():
+                continue
+            if index != preferred:
+                self.fallbacks += 1
+            try:
+                resp = await self.pools[index].request(job, timeout)
+            except BackendUnavailable as e:
+                log.warning(str(e))
+                breaker.record_failure()
+                last_error = e
+                continue # El trabajo no se envió: se prueba con otro backend
+            except (asyncio.TimeoutError, ConnectionError):
+                breaker.record_failure()
+                raise
+            except asyncio.CancelledError:
+                breaker.cancel_probe()
+                raise
+            breaker.record_success()
+            return resp
+
+        raise last_error
+
+    def in_flight(self) -> int:
+        return sum(pool.in_flight() for pool in self.pools)
+
+    def stats(self) -> Dict:
+        return {
+            "fallbacks": self.fallbacks,
+            "backends": [
+                {
+                    "backend": pool.name,
+                    "in_flight": pool.in_flight(),
+                    "circuit_open": breaker.is_open,
+                    "consecutive_failures": breaker.failures,
+                    "trips": breaker.trips,
+                }
+                for pool, breaker in zip(self.pools, self.breakers)
+            ],
+        }
+
+    async def close(self):
+        for pool in self.pools:
+            await pool.close()
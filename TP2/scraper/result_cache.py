@@ -0,0 +1,117 @@
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from common.serialization import serialize_data
+
+log = logging.getLogger(__name__)
+
+# Valores por defecto del cache de respuestas de /scrape
+DEFAULT_TTL_SECONDS = 300
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024 # 64 MB (los screenshots en Base64 pesan)
+
+def normalize_url(url: str) -> str:
+    """
+    Normaliza una URL para usarla como clave del cache:
+    esquema y host en minúsculas, sin puerto por defecto, sin fragmento
+    y con path '/' si viene vacío. Si la URL no se puede interpretar
+    (p. ej. un puerto fuera de rango) se usa tal cual como clave.
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url.strip()
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]" # Literal IPv6
+
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+
+    path = parts.path or "/"
+    return urlunsplit((scheme, host, path, parts.query, ""))
+
+class ResultCache:
+    """
+    Cache en memoria de respuestas consolidadas de /scrape.
+
+    Las entradas expiran tras 'ttl' segundos y se desalojan en orden LRU
+    cuando se supera la cantidad máxima de entradas o de bytes.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        # clave -> (expira_en, tamaño_en_bytes, respuesta)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, url: str) -> Optional[dict]:
+        """Devuelve la respuesta cacheada para la URL o None si no hay (o expiró)."""
+        key = normalize_url(url)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, _, response = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return response
+
+    def put(self, url: str, response: dict):
+        """Guarda una respuesta y desaloja entradas LRU si se exceden los límites."""
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+
+        key = normalize_url(url)
+        size = len(serialize_data(response))
+        if size > self.max_bytes:
+            log.info(f"Respuesta para {url} ({size} bytes) excede el cache, no se guarda.")
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = (time.monotonic() + self.ttl, size, response)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> Dict:
+        """Contadores del cache para monitoreo."""
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
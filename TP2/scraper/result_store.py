@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import sqlite3
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from common.protocol import pack_message, unpack_message
+from scraper.result_cache import normalize_url
+
+log = logging.getLogger(__name__)
+
+# Valores por defecto del store persistente de respuestas
+DEFAULT_TTL_SECONDS = 24 * 3600
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024 # 512 MB en disco
+DEFAULT_THREADS = 2
+COMPACT_INTERVAL = 60 # Cada cuánto se borran entradas vencidas y se controla el tamaño
+BUSY_TIMEOUT_MS = 5000 # Espera ante locks de otros procesos (modo prefork)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    body BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_expires_at ON results (expires_at);
+CREATE INDEX IF NOT EXISTS results_stored_at ON results (stored_at);
+"""
+
+class ResultStore:
+    """
+    Store persistente (SQLite) de respuestas consolidadas de /scrape, usado
+    como segundo nivel debajo de ResultCache: sobrevive a los reinicios del
+    Servidor A y evita reenviar todo ese trabajo a B.
+
+    Cada respuesta se guarda con el mismo formato de mensaje que usa el
+    protocolo A <-> B (header JSON + adjuntos binarios), así el screenshot
+    y los thumbnails quedan en disco como bytes crudos, sin Base64.
+
+    SQLite se usa en modo WAL (lecturas concurrentes, también entre los
+    workers del modo prefork) y siempre desde un pool de hilos propio, para
+    no bloquear el event loop. Las entradas expiran tras 'ttl' segundos y
+    una compactación periódica borra las vencidas y, si se supera
+    'max_bytes', las más antiguas.
+    """
+
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL_SECONDS,
+                 max_bytes: int = DEFAULT_MAX_BYTES, threads: int = DEFAULT_THREADS):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._executor = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="result-store")
+        self._local = threading.local()
+        self._conns = []
+        self._conns_lock = threading.Lock()
+        self._writes = set()
+        self._compactor: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.compacted = 0
+        self.errors = 0
+
+    # --- Operaciones SQLite (corren en el pool de hilos) ---
+
+    def _conn(self) -> sqlite3.Connection:
+        # Una conexión por hilo: sqlite3 no comparte conexiones entre hilos
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # check_same_thread=False solo para poder cerrarla desde close()
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL") # En WAL alcanza para no corromper la base
+            self._local.conn = conn
+            with self._conns_lock:
+                self._conns.append(conn)
+        return conn
+
+    def _init_db(self):
+        self._conn().executescript(_SCHEMA)
+
+    def _get(self, key: str, now: float) -> Optional[bytes]:
+        row = self._conn().execute(
+            "SELECT body FROM results WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _put(self, key: str, url: str, response: dict, now: float) -> bool:
+        # Se empaqueta en el hilo: armar el mensaje copia el screenshot
+        body = pack_message(response)
+        if not body or len(body) > self.max_bytes:
+            return False
+        self._conn().execute(
+            "INSERT OR REPLACE INTO results (key, url, stored_at, expires_at, size, body) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, url, now, now + self.ttl, len(body), body),
+        )
+        return True
+
+    def _compact(self, now: float) -> int:
+        conn = self._conn()
+        removed = conn.execute("DELETE FROM results WHERE expires_at <= ?", (now,)).rowcount
+
+        (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()
+        if total > self.max_bytes:
+            # Se borran las más antiguas hasta volver al límite
+            excess = total - self.max_bytes
+            doomed = []
+            cursor = conn.execute("SELECT key, size FROM results ORDER BY stored_at")
+            for key, size in cursor:
+                if excess <= 0:
+                    break
+                doomed.append((key,))
+                excess -= size
+            cursor.close()
+            conn.executemany("DELETE FROM results WHERE key = ?", doomed)
+            removed += len(doomed)
+
+        if removed:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return removed
+
+    def _summary(self) -> Dict:
+        entries, total = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()
+        return {"entries": entries, "bytes": total}
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    # --- API asíncrona ---
+
+    async def open(self):
+        await self._run(self._init_db)
+        self._compactor = asyncio.create_task(self._compact_loop())
+        log.info(f"Store de respuestas en {self.path} (TTL {self.ttl}s, máx. {self.max_bytes} bytes)")
+
+    async def get(self, url: str) -> Optional[dict]:
+        """Devuelve la respuesta guardada para la URL, o None si no hay (o venció)."""
+        try:
+            body = await self._run(self._get, normalize_url(url), time.time())
+        except sqlite3.Error as e:
+            self.errors += 1
+            log.error(f"Error leyendo del store de respuestas: {e}")
+            return None
+        if body is None:
+            self.misses += 1
+            return None
+        try:
+            response = unpack_message(body)
+        except (struct.error, ValueError) as e:
+            self.errors += 1
+            log.error(f"Entrada corrupta en el store de respuestas para {url}: {e}")
+            return None
+        self.hits += 1
+        return response
+
+    def put(self, url: str, response: dict):
+        """Guarda la respuesta en segundo plano (no demora al que responde)."""
+        if self.ttl <= 0:
+            return
+        task = asyncio.create_task(self._write(normalize_url(url), url, response))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def _write(self, key: str, url: str, response: dict):
+        try:
+            if await self._run(self._put, key, url, response, time.time()):
+                self.stored += 1
+        except sqlite3.Error as e:
+            self.errors += 1
+            log.error(f"Error escribiendo en el store de respuestas: {e}")
+
+    async def compact(self) -> int:
+        removed = await self._run(self._compact, time.time())
+        self.compacted += removed
+        if removed:
+            log.info(f"Store de respuestas: {removed} entradas eliminadas al compactar.")
+        return removed
+
+    async def _compact_loop(self):
+        while True:
+            try:
+                await self.compact()
+            except sqlite3.Error as e:
+                self.errors += 1
+                log.error(f"Error compactando el store de respuestas: {e}")
+            await asyncio.sleep(COMPACT_INTERVAL)
+
+    async def summary(self) -> Dict:
+        """Contadores más cantidad de entradas y bytes en disco."""
+        try:
+            on_disk = await self._run(self._summary)
+        except sqlite3.Error:
+            on_disk = {}
+        return {**on_disk, **self.stats()}
+
+    def stats(self) -> Dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stored": self.stored,
+            "compacted": self.compacted,
+            "errors": self.errors,
+        }
+
+    async def close(self):
+        if self._compactor:
+            self._compactor.cancel()
+            await asyncio.gather(self._compactor, return_exceptions=True)
+        # Las escrituras pendientes se terminan antes de cerrar
+        await asyncio.gather(*list(self._writes), return_exceptions=True)
+        self._executor.shutdown(wait=True)
+        with self._conns_lock:
+            for conn in self._conns:
+                conn.close()
+            self._conns.clear()
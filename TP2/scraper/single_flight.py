@@ -0,0 +1,59 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+log = logging.getLogger(__name__)
+
+class SingleFlight:
+    """
+    Deduplicación de trabajos en curso (request coalescing).
+
+    La primera llamada para una clave lanza el trabajo en una tarea; las
+    llamadas concurrentes con la misma clave esperan esa misma tarea y
+    reciben el mismo resultado (o la misma excepción).
+
+    Si un llamador es cancelado, solo deja de esperar. La tarea compartida
+    se cancela únicamente cuando ya no queda nadie esperándola, y en ese
+    caso todos los que esperan reciben CancelledError.
+    """
+
+    def __init__(self):
+        # clave -> [tarea, cantidad de llamadores esperando]
+        self._calls: Dict[Hashable, list] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            task = asyncio.ensure_future(func())
+            call = [task, 0]
+            self._calls[key] = call
+            task.add_done_callback(lambda _t: self._forget(key, call))
+        else:
+            self.coalesced += 1
+            log.info(f"Uniendo petición concurrente a trabajo en curso: {key}")
+
+        task = call[0]
+        call[1] += 1
+        try:
+            # shield: cancelar a un llamador no cancela la tarea compartida
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and call[1] == 1:
+                task.cancel()
+            raise
+        finally:
+            call[1] -= 1
+
+    def _forget(self, key: Hashable, call: list):
+        # Solo se borra si la clave sigue apuntando a esta llamada
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def in_progress(self, key: Hashable) -> bool:
+        """True si ya hay un trabajo en curso para la clave."""
+        return key in self._calls
+
+    def in_flight(self) -> int:
+        """Cantidad de claves con trabajo en curso."""
+        return len(self._calls)
@@ -0,0 +1,200 @@
+import asyncio
+import datetime
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from common.serialization import serialize_data
+
+log = logging.getLogger(__name__)
+
+# Valores por defecto de la cola de tareas asíncronas
+DEFAULT_CONCURRENCY = 8
+DEFAULT_MAX_QUEUED = 1000
+DEFAULT_RETENTION_SECONDS = 600
+SWEEP_INTERVAL = 5 # Cada cuánto se eliminan resultados vencidos
+
+# Estados de una tarea
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    if ts is None:
+        return None
+    return datetime.datetime.utcfromtimestamp(ts).isoformat() + "Z"
+
+class Task:
+    """Una petición de análisis encolada, con su estado y su resultado."""
+
+    def __init__(self, url: str):
+        self.id = uuid.uuid4().hex
+        self.url = url
+        self.state = QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.expires_at: Optional[float] = None
+        self.http_status: Optional[int] = None
+        self.result: Optional[dict] = None
+
+    def status(self) -> Dict:
+        return {
+            "task_id": self.id,
+            "url": self.url,
+            "state": self.state,
+            "created_at": _iso(self.created_at),
+            "started_at": _iso(self.started_at),
+            "finished_at": _iso(self.finished_at),
+            "expires_at": _iso(self.expires_at),
+            "http_status": self.http_status,
+        }
+
+class TaskQueue:
+    """
+    Cola acotada de tareas de análisis con 'concurrency' workers.
+
+    submit() devuelve enseguida una Task; los workers la ejecutan con
+    'runner' (que devuelve (http_status, cuerpo)) y el resultado queda
+    disponible durante 'retention' segundos.
+
+    Si se indica 'task_dir', el estado y el resultado de cada tarea se
+    escriben también como JSON en ese directorio, para que cualquier
+    proceso worker del modo prefork pueda responder /status y /result.
+    """
+
+    def __init__(self, runner: Callable[[str], Awaitable[Tuple[int, dict]]],
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 max_queued: int = DEFAULT_MAX_QUEUED,
+                 retention: float = DEFAULT_RETENTION_SECONDS,
+                 task_dir: Optional[str] = None):
+        self.runner = runner
+        self.concurrency = max(1, concurrency)
+        self.retention = retention
+        self.task_dir = task_dir
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self._tasks: Dict[str, Task] = {}
+        self._workers = []
+
+        self.submitted = 0
+        self.rejected = 0
+
+    async def start(self):
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        self._workers.append(asyncio.create_task(self._sweeper()))
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+    async def submit(self, url: str) -> Task:
+        """Encola una tarea. Lanza asyncio.QueueFull si la cola está llena."""
+        task = Task(url)
+        try:
+            self._queue.put_nowait(task)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise
+        self._tasks[task.id] = task
+        self.submitted += 1
+        await self._persist(task)
+        return task
+
+    async def get(self, task_id: str) -> Optional[Tuple[Dict, Optional[dict]]]:
+        """Devuelve (estado, resultado) de una tarea, o None si no existe o venció."""
+        task = self._tasks.get(task_id)
+        if task is not None:
+            return task.status(), task.result
+
+        # La tarea puede pertenecer a otro proceso worker
+        if self.task_dir is None or not task_id.isalnum():
+            return None
+        loop = asyncio.get_running_loop()
+        record = await loop.run_in_executor(None, self._read_file, task_id)
+        if record is None:
+            return None
+        return record["task"], record["result"]
+
+    async def _worker(self):
+        while True:
+            task = await self._queue.get()
+            try:
+                task.state = RUNNING
+                task.started_at = time.time()
+                await self._persist(task)
+
+                try:
+                    task.http_status, task.result = await self.runner(task.url)
+                    task.state = DONE if task.http_status == 200 else FAILED
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    log.exception(f"Error ejecutando tarea {task.id}")
+                    task.http_status = 500
+                    task.result = {"status": "error", "message": f"Task failed: {e}"}
+                    task.state = FAILED
+
+                task.finished_at = time.time()
+                task.expires_at = task.finished_at + self.retention
+                await self._persist(task)
+            finally:
+                self._queue.task_done()
+
+    async def _sweeper(self):
+        """Elimina los resultados cuya ventana de retención ya venció."""
+        while True:
+            await asyncio.sleep(min(SWEEP_INTERVAL, max(self.retention, 1)))
+            now = time.time()
+            expired = [t for t in self._tasks.values() if t.expires_at and t.expires_at <= now]
+            for task in expired:
+                del self._tasks[task.id]
+                if self.task_dir is not None:
+                    try:
+                        os.remove(self._path(task.id))
+                    except FileNotFoundError:
+                        pass
+            if expired:
+                log.info(f"{len(expired)} resultados de tareas vencidos eliminados.")
+
+    # --- Persistencia compartida entre workers ---
+
+    def _path(self, task_id: str) -> str:
+        return os.path.join(self.task_dir, f"{task_id}.json")
+
+    async def _persist(self, task: Task):
+        if self.task_dir is None:
+            return
+        record = {"task": task.status(), "result": task.result, "expires_at": task.expires_at}
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._write_file, task.id, record)
+
+    def _write_file(self, task_id: str, record: dict):
+        # Escritura atómica: nunca se lee un JSON a medio escribir
+        tmp_path = self._path(task_id) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(serialize_data(record))
+        os.replace(tmp_path, self._path(task_id))
+
+    def _read_file(self, task_id: str) -> Optional[dict]:
+        try:
+            with open(self._path(task_id), encoding="utf-8") as f:
+                record = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if record.get("expires_at") and record["expires_at"] <= time.time():
+            return None
+        return record
+
+    def stats(self) -> Dict:
+        return {
+            "queued": self._queue.qsize(),
+            "running": sum(1 for t in self._tasks.values() if t.state == RUNNING),
+            "retained": len(self._tasks),
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+        }
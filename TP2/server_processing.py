@@ -1,21 +1,24 @@
 #!/usr/bin/env python3
 import argparse
-import base64
 import socketserver
 import json
 import logging
 import os
 import struct
-from concurrent.futures import ProcessPoolExecutor, TimeoutError
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError, wait
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 
 # Importaciones de módulos locales
-from common.protocol import recv_message, pack_message, HEADER_SIZE
+from common.protocol import recv_message, send_message, ConnectionClosed
+from common.metrics import stage_timer
 from processor.screenshot import generate_screenshot
 from processor.performance import analyze_performance
 from processor.image_processor import process_images
+from processor import image_processor
+from processor import thumbnail_cache
+from processor import browser_pool
 
 # Configuración de Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s [Servidor B] [%(levelname)s] %(message)s')
@@ -23,116 +26,196 @@ log = logging.getLogger(__name__)
 
 # Timeout para el trabajo completo en el pool
 JOB_TIMEOUT_SECONDS = 120
+# Tiempo máximo para abrir los navegadores de todos los workers al iniciar
+WARM_UP_TIMEOUT_SECONDS = 60
 
-# --- Función de Tarea (CPU-Bound) ---
-# Esta función se ejecutará en el ProcessPoolExecutor
-def worker_process(job_data: dict) -> dict:
+# --- Subtareas de un trabajo (se ejecutan en los pools de procesos) ---
+# Cada trabajo se divide en dos subtareas independientes que corren a la vez,
+# en pools separados: la captura con el navegador y los thumbnails. La
+# latencia del trabajo es la de la subtarea más lenta, no la suma.
+
+def capture_page(url: str, submitted_at: float = None) -> dict:
     """
-    Ejecuta todas las tareas CPU-Bound para una solicitud.
+    Subtarea del navegador: screenshot y análisis de rendimiento.
+    Devuelve también 'timings': segundos por etapa, para que el Servidor A
+    los agregue en sus métricas. 'submitted_at' (time.time() al encolar)
+    permite medir la espera en el pool.
     """
-    url = job_data.get('url')
-    image_urls = job_data.get('image_urls', [])
-    
+    timings = {}
+    if submitted_at is not None:
+        timings["pool_wait"] = max(0.0, time.time() - submitted_at)
+    job_start = time.perf_counter()
+
     pid = os.getpid()
-    log.info(f"[PID {pid}] Iniciando análisis para: {url}")
+    log.info(f"[PID {pid}] Iniciando captura para: {url}")
     
     # 1. Generar Screenshot y 2. Análisis de Rendimiento (con Selenium)
-    # Optimizamos reutilizando el driver para screenshot y performance
+    # El navegador es del proceso worker y se reutiliza entre trabajos
+    # (browser_start solo pesa cuando hay que abrir uno nuevo)
     
-    screenshot_b64 = ""
+    screenshot_png = b"" # Bytes crudos: viajan como adjunto, sin Base64
     performance_data = {}
-    
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--window-size=1280,720")
     driver = None
+    healthy = True
     
     try:
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.set_page_load_timeout(30)
+        with stage_timer(timings, "browser_start"):
+            driver = browser_pool.acquire()
         
         log.info(f"[PID {pid}] Navegando a {url} (Selenium)...")
-        driver.get(url)
+        with stage_timer(timings, "navigation"):
+            driver.get(url)
         
         # Tarea 1: Screenshot
         log.info(f"[PID {pid}] Generando screenshot...")
-        png_bytes = driver.get_screenshot_as_png()
-        screenshot_b64 = base64.b64encode(png_bytes).decode('utf-8')
+        with stage_timer(timings, "screenshot"):
+            screenshot_png = driver.get_screenshot_as_png()
         
         # Tarea 2: Performance
         log.info(f"[PID {pid}] Analizando rendimiento...")
-        performance_data = analyze_performance(url, driver)
+        with stage_timer(timings, "performance"):
+            performance_data = analyze_performance(url, driver)
         
     except Exception as e:
         log.error(f"[PID {pid}] Error en tareas de Selenium para {url}: {e}")
         performance_data = {"error": f"Selenium failed: {e}"}
+        healthy = not browser_pool.is_crash(e)
     finally:
+        # Se limpia para el próximo trabajo (o se recicla si se rompió)
         if driver:
-            driver.quit()
-            
-    # Tarea 3: Análisis de Imágenes (Thumbnails)
-    log.info(f"[PID {pid}] Generando thumbnails...")
+            with stage_timer(timings, "browser_reset"):
+                browser_pool.release(driver, healthy)
+
+    timings["capture_total"] = time.perf_counter() - job_start
+    log.info(f"[PID {pid}] Captura completada para: {url}")
+    return {"screenshot": screenshot_png, "performance": performance_data, "timings": timings}
+
+def generate_thumbnails(image_urls: list, submitted_at: float = None) -> dict:
+    """Subtarea de imágenes: descarga y thumbnails (Tarea 3)."""
+    timings = {}
+    if submitted_at is not None:
+        timings["images_pool_wait"] = max(0.0, time.time() - submitted_at)
+
+    log.info(f"[PID {os.getpid()}] Generando thumbnails...")
     try:
-        thumbnails = process_images(image_urls)
+        with stage_timer(timings, "images"):
+            thumbnails = process_images(image_urls)
     except Exception as e:
-        log.error(f"[PID {pid}] Error en procesamiento de imágenes: {e}")
+        log.error(f"[PID {os.getpid()}] Error en procesamiento de imágenes: {e}")
         thumbnails = []
-
-    log.info(f"[PID {pid}] Análisis completado para: {url}")
-    
-    return {
-        "screenshot": screenshot_b64,
-        "performance": performance_data,
-        "thumbnails": thumbnails
-    }
+    return {"thumbnails": thumbnails, "timings": timings}
 
 # ----------------------------------------
 
 class TaskHandler(socketserver.BaseRequestHandler):
     """
     Manejador para cada conexión TCP del Servidor A.
+
+    La conexión es persistente: se leen trabajos en bucle hasta que A la
+    cierra. Cada trabajo se atiende en su propio hilo y la respuesta lleva
+    el mismo 'request_id' que el pedido, así que varios trabajos pueden
+    estar en vuelo sobre el mismo socket y responderse en cualquier orden.
     """
-    
+
+    def setup(self):
+        # Varios hilos escriben respuestas en el mismo socket
+        self.send_lock = threading.Lock()
+        self.job_threads = []
+
     def handle(self):
+        log.info(f"Conexión recibida de: {self.client_address}")
         try:
-            # --- 1. Recibir datos (usando el protocolo) ---
-            log.info(f"Conexión recibida de: {self.client_address}")
-            job_data = recv_message(self.request)
-            log.info(f"Recibida tarea para: {job_data.get('url')}")
+            while True:
+                # --- 1. Recibir datos (usando el protocolo) ---
+                job_data = recv_message(self.request)
+                log.info(f"Recibida tarea para: {job_data.get('url')}")
+
+                thread = threading.Thread(target=self.run_job, args=(job_data,), daemon=True)
+                thread.start()
+                self.job_threads = [t for t in self.job_threads if t.is_alive()]
+                self.job_threads.append(thread)
 
+        except ConnectionClosed:
+            log.info(f"Conexión cerrada por {self.client_address}.")
+        except (ConnectionError, struct.error):
+            log.warning(f"Error de protocolo/conexión con {self.client_address}. Cliente desconectado.")
+        finally:
+            # Se esperan los trabajos en curso antes de cerrar el socket
+            for thread in self.job_threads:
+                thread.join()
+
+    def run_job(self, job_data: dict):
+        """Ejecuta las subtareas de un trabajo en sus pools y envía la respuesta."""
+        request_id = job_data.pop('request_id', None)
+        try:
             start = datetime.now()
             
-            # --- 2. Enviar tarea al Pool de Procesos ---
-            pool = self.server.process_pool
-            future = pool.submit(worker_process, job_data)
+            # --- 2. Enviar las subtareas a sus pools (corren a la vez) ---
+            url = job_data.get('url')
+            submitted_at = time.time()
+            capture = self.server.capture_executor.submit(capture_page, url, submitted_at)
+            images = self.server.image_executor.submit(
+                generate_thumbnails, job_data.get('image_urls', []), submitted_at
+            )
             
-            # Obtenemos el resultado (esto bloquea ESTE HILO, 
-            # pero no el servidor principal)
-            result_data = future.result(timeout=JOB_TIMEOUT_SECONDS) 
+            # Esperamos ambas (esto bloquea ESTE HILO, 
+            # pero no el servidor principal ni la lectura de otros trabajos)
+            done, not_done = wait([capture, images], timeout=JOB_TIMEOUT_SECONDS)
+            if not done:
+                raise TimeoutError()
+            result_data = self.merge_results(capture, images, not_done)
 
             end = datetime.now()
             log.info(f"Trabajo completado para {job_data.get('url')} en {end-start}")
+            result_data.setdefault("timings", {})["server_b_total"] = (end - start).total_seconds()
 
             # --- 3. Enviar respuesta ---
-            response_msg = pack_message(result_data)
-            self.request.sendall(response_msg)
+            self.send_response(result_data, request_id)
             
-        except (ConnectionError, struct.error):
-            log.warning(f"Error de protocolo/conexión con {self.client_address}. Cliente desconectado.")
         except TimeoutError:
             log.error(f"Timeout en job para {job_data.get('url')} (límite: {JOB_TIMEOUT_SECONDS}s)")
-            self.send_error(f"Processing job timed out after {JOB_TIMEOUT_SECONDS}s")
+            self.send_error(f"Processing job timed out after {JOB_TIMEOUT_SECONDS}s", request_id)
         except Exception as e:
             log.error(f"Error en TaskHandler: {e}", exc_info=True)
-            self.send_error(f"Error interno del Servidor B: {e}")
+            self.send_error(f"Error interno del Servidor B: {e}", request_id)
+
+    @staticmethod
+    def merge_results(capture, images, not_done) -> dict:
+        """
+        Une los resultados parciales de las subtareas. Si una no terminó a
+        tiempo (o falló) se responde igual con lo que haya de la otra.
+        """
+        result = {"screenshot": b"", "performance": {}, "thumbnails": [], "timings": {}}
+        for future, name in ((capture, "capture"), (images, "images")):
+            if future in not_done:
+                future.cancel()
+                log.warning(f"Subtarea '{name}' sin terminar tras {JOB_TIMEOUT_SECONDS}s")
+                partial = {}
+                if name == "capture":
+                    partial["performance"] = {"error": f"Capture timed out after {JOB_TIMEOUT_SECONDS}s"}
+            else:
+                try:
+                    partial = future.result()
+                except Exception as e:
+                    log.error(f"Subtarea '{name}' falló: {e}")
+                    partial = {"performance": {"error": f"Capture failed: {e}"}} if name == "capture" else {}
+            result["timings"].update(partial.pop("timings", {}))
+            result.update(partial)
+        return result
 
-    def send_error(self, error_msg: str):
+    def send_response(self, data: dict, request_id=None):
+        """Envía una respuesta, etiquetada con el request_id si el pedido lo traía."""
+        if request_id is not None:
+            data = {**data, "request_id": request_id}
+        # Screenshot y thumbnails van como adjuntos binarios (sendmsg)
+        with self.send_lock:
+            send_message(self.request, data)
+
+    def send_error(self, error_msg: str, request_id=None):
         """Intenta enviar un error de vuelta al Servidor A."""
         try:
             error_response = {"status": "error", "error": error_msg}
-            self.request.sendall(pack_message(error_response))
+            self.send_response(error_response, request_id)
         except Exception:
             pass # La conexión ya puede estar cerrada
 
@@ -140,9 +223,23 @@ class ThreadedTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
     """Servidor TCP que usa hilos para manejar cada conexión."""
     allow_reuse_address = True
     
-    def __init__(self, server_address, RequestHandlerClass, pool):
+    def __init__(self, server_address, RequestHandlerClass, capture_executor, image_executor):
         super().__init__(server_address, RequestHandlerClass)
-        self.process_pool = pool
+        self.capture_executor = capture_executor
+        self.image_executor = image_executor
+
+def warm_up_pool(pool: ProcessPoolExecutor, processes: int):
+    """
+    Arranca todos los workers (y sus navegadores) antes de aceptar trabajos,
+    así las primeras peticiones no pagan el inicio de Chrome.
+    """
+    start = time.perf_counter()
+    futures = [pool.submit(browser_pool.warm_up) for _ in range(processes)]
+    try:
+        pids = {f.result(timeout=WARM_UP_TIMEOUT_SECONDS) for f in futures}
+        log.info(f"Pool listo: {len(pids)} workers con navegador en {time.perf_counter() - start:.2f}s.")
+    except TimeoutError:
+        log.warning(f"El warm-up del pool superó {WARM_UP_TIMEOUT_SECONDS}s, se continúa igual.")
 
 def main():
     default_procs = os.cpu_count() or 4
@@ -153,20 +250,62 @@ def main():
     parser.add_argument('-i', '--ip', required=True, help="Dirección de escucha (IPv4)")
     parser.add_argument('-p', '--port', required=True, type=int, help="Puerto de escucha")
     parser.add_argument('-n', '--processes', type=int, default=default_procs, 
-                        help="Número de procesos en el pool (default: CPU count)")
+                        help="Procesos del pool de captura (navegadores) (default: CPU count)")
+    parser.add_argument('--image-workers', type=int, default=max(2, default_procs // 2),
+                        help="Procesos del pool de imágenes (descarga y thumbnails)")
+    parser.add_argument('--image-concurrency', type=int, default=image_processor.DEFAULT_DOWNLOAD_CONCURRENCY,
+                        help="Descargas de imágenes simultáneas por proceso del pool de imágenes")
+    parser.add_argument('--image-timeout', type=float, default=image_processor.DEFAULT_IMAGE_TIMEOUT,
+                        help="Segundos máximos por imagen (descarga + thumbnail)")
+    parser.add_argument('--thumb-format', choices=sorted(image_processor.THUMBNAIL_FORMATS),
+                        default=image_processor.DEFAULT_THUMBNAIL_FORMAT,
+                        help="Formato de salida de los thumbnails")
+    parser.add_argument('--thumb-quality', type=int, default=image_processor.DEFAULT_THUMBNAIL_QUALITY,
+                        help="Calidad (1-100) de los thumbnails WebP/JPEG")
+    parser.add_argument('--thumb-cache-mb', type=int, default=thumbnail_cache.DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="MB del cache L1 de thumbnails en memoria, por proceso (0 lo desactiva)")
+    parser.add_argument('--thumb-cache-dir', default=thumbnail_cache.DEFAULT_DISK_DIR,
+                        help="Directorio del cache L2 de thumbnails en disco, compartido por los workers "
+                             "(vacío lo desactiva)")
+    parser.add_argument('--thumb-cache-disk-mb', type=int, default=thumbnail_cache.DEFAULT_DISK_MAX_BYTES // (1024 * 1024),
+                        help="MB máximos del cache de thumbnails en disco")
+    parser.add_argument('--thumb-cache-url-ttl', type=float, default=thumbnail_cache.DEFAULT_URL_TTL_SECONDS,
+                        help="Segundos que se reutiliza el thumbnail de una URL sin volver a descargarla")
+    parser.add_argument('--browser-max-jobs', type=int, default=browser_pool.DEFAULT_MAX_JOBS_PER_BROWSER,
+                        help="Trabajos que atiende cada navegador antes de reciclarse")
     
     args = parser.parse_args()
 
-    log.info(f"Iniciando ProcessPoolExecutor con {args.processes} workers...")
+    log.info(f"Iniciando pools: {args.processes} procesos de captura, {args.image_workers} de imágenes...")
+
+    thumb_cache = None
+    if args.thumb_cache_mb > 0 or args.thumb_cache_dir:
+        thumb_cache = {
+            "max_bytes": args.thumb_cache_mb * 1024 * 1024,
+            "url_ttl": args.thumb_cache_url_ttl,
+            "disk_dir": args.thumb_cache_dir or None,
+            "disk_max_bytes": args.thumb_cache_disk_mb * 1024 * 1024,
+        }
+
+    # Usamos context managers para asegurar que los pools se cierren.
+    # Cada worker de captura abre su navegador al arrancar (init_worker) y lo reutiliza;
+    # cada worker de imágenes mantiene su sesión HTTP (conexiones keep-alive por host).
+    with ProcessPoolExecutor(max_workers=args.processes,
+                             initializer=browser_pool.init_worker,
+                             initargs=(args.browser_max_jobs,)) as capture_executor, \
+         ProcessPoolExecutor(max_workers=args.image_workers,
+                             initializer=image_processor.init_worker,
+                             initargs=(args.image_concurrency, args.image_timeout, thumb_cache,
+                                       args.thumb_format, args.thumb_quality)) as image_executor:
+        warm_up_pool(capture_executor, args.processes)
 
-    # Usamos un context manager para asegurar que el pool se cierre
-    with ProcessPoolExecutor(max_workers=args.processes) as pool:
         server_address = (args.ip, args.port)
         
         server = ThreadedTCPServer(
             server_address, 
             TaskHandler,
-            pool=pool
+            capture_executor=capture_executor,
+            image_executor=image_executor,
         )
         
         log.info(f"Servidor B (Procesamiento) escuchando en {args.ip}:{args.port}")
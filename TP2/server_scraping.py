@@ -3,61 +3,82 @@ import argparse
 import asyncio
 import logging
 import datetime
-import struct
 import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 import aiohttp
 from aiohttp import web, ClientSession
 
 # Importaciones de módulos locales
-from common.protocol import pack_message, HEADER_SIZE
-from common.serialization import deserialize_data
-from scraper.async_http import fetch_url
-from scraper.html_parser import scrape_html_content
-from scraper.metadata_extractor import extract_meta_tags
+from common.serialization import serialize_data
+from common.metrics import MetricsRegistry, stage_timer, write_snapshot, read_snapshots
+from scraper.async_http import (fetch_page, HostScheduler, UnsupportedContentError, MAX_BODY_BYTES,
+                                DEFAULT_HOST_CONCURRENCY, DEFAULT_HOST_RATE, DEFAULT_GLOBAL_CONCURRENCY)
+from scraper.html_parser import parse_page
+from scraper.result_cache import ResultCache, normalize_url, DEFAULT_TTL_SECONDS, DEFAULT_MAX_ENTRIES, DEFAULT_MAX_BYTES
+from scraper.result_store import (ResultStore, DEFAULT_TTL_SECONDS as DEFAULT_STORE_TTL,
+                                  DEFAULT_MAX_BYTES as DEFAULT_STORE_MAX_BYTES)
+from scraper.single_flight import SingleFlight
+from scraper.admission import AdmissionController, Overloaded, DEFAULT_MAX_IN_FLIGHT, DEFAULT_MAX_QUEUE
+from scraper.page_cache import PageCache, PageEntry, DEFAULT_MAX_BYTES as DEFAULT_PAGE_CACHE_BYTES
+from scraper.processor_client import (ProcessorCluster, BackendUnavailable, parse_backend, DEFAULT_POOL_SIZE,
+                                      DEFAULT_MAX_PENDING, DEFAULT_BREAKER_FAILURES, DEFAULT_BREAKER_COOLDOWN)
+from scraper.crawler import Crawler, DEFAULT_MAX_DEPTH, DEFAULT_MAX_PAGES, MAX_DEPTH_LIMIT, MAX_PAGES_LIMIT
+from scraper.task_queue import (TaskQueue, DONE, FAILED, DEFAULT_CONCURRENCY,
+                                DEFAULT_MAX_QUEUED, DEFAULT_RETENTION_SECONDS)
 
 # Configuración de Logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s [Servidor A] [%(levelname)s] %(message)s')
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [Servidor A] [PID %(process)d] [%(levelname)s] %(message)s')
 log = logging.getLogger(__name__)
 
 # Timeout para la comunicación con Servidor B
 PROCESSOR_TIMEOUT = 130 # Debe ser mayor que el JOB_TIMEOUT_SECONDS de B
 
+# Modo prefork
+LISTEN_BACKLOG = 1024
+SHUTDOWN_TIMEOUT = 10 # Segundos que el padre espera el cierre de cada worker
+METRICS_SNAPSHOT_INTERVAL = 5 # Cada cuántos segundos cada worker publica sus métricas a los demás
+
+# Segundos sugeridos al cliente (Retry-After) cuando el servidor está saturado
+RETRY_AFTER_SECONDS = 5
+
+# Con --compress, las respuestas con al menos este tamaño se comprimen si el cliente lo acepta
+COMPRESS_MIN_BYTES = 1024
+# Los cuerpos son casi todo Base64 (screenshot y thumbnails): sin repeticiones
+# que LZ77 pueda aprovechar, solo Huffman ahorra lo mismo (~25%) con 1/3 de CPU
+COMPRESS_STRATEGY = zlib.Z_HUFFMAN_ONLY
+
+# Lotes (POST /scrape/batch)
+BATCH_MAX_URLS = 10000
+DEFAULT_BATCH_CONCURRENCY = 16
+
+# Crawl (POST /crawl)
+DEFAULT_CRAWL_CONCURRENCY = 8
+
+# Parseo de HTML fuera del event loop
+DEFAULT_PARSE_WORKERS = 2
+DEFAULT_PARSE_INLINE_MAX_BYTES = 256 * 1024 # Por debajo de esto se parsea en el loop
+
 # --- 3. Comunicación Asíncrona con Servidor B ---
 
-async def talk_with_processor(job: dict, host: str, port: int) -> dict:
+async def talk_with_processor(job: dict, pool: ProcessorCluster) -> dict:
     """
     Envía un trabajo al Servidor B (procesamiento) y espera su respuesta.
-    Utiliza sockets asíncronos (asyncio streams).
+    El cluster elige el backend por la URL y usa una conexión persistente:
+    muchos trabajos comparten el mismo socket y las respuestas se asocian
+    por request_id.
     """
-    reader = writer = None
     try:
-        # 1. Conectar asíncronamente
-        log.info(f"Conectando al Servidor B en {host}:{port}...")
-        reader, writer = await asyncio.wait_for(
-            asyncio.open_connection(host, port),
-            timeout=10 # Timeout de conexión
-        )
-
-        # 2. Enviar mensaje (Header + Payload)
-        msg = pack_message(job)
-        writer.write(msg)
-        await writer.drain()
-        log.info(f"Trabajo enviado a Servidor B para: {job.get('url')}")
-
-        # 3. Leer respuesta (Header)
-        header_bytes = await asyncio.wait_for(
-            reader.readexactly(HEADER_SIZE), 
-            timeout=PROCESSOR_TIMEOUT
-        )
-        (length,) = struct.unpack('!I', header_bytes) # Big-Endian
-
-        # 4. Leer respuesta (Payload)
-        body_bytes = await asyncio.wait_for(
-            reader.readexactly(length), 
-            timeout=PROCESSOR_TIMEOUT
-        )
-        
-        resp = deserialize_data(body_bytes)
+        resp = await pool.request(job, timeout=PROCESSOR_TIMEOUT)
         log.info(f"Respuesta recibida de Servidor B para: {job.get('url')}")
         return resp
 
@@ -65,101 +86,153 @@ async def talk_with_processor(job: dict, host: str, port: int) -> dict:
         msg = f"Timeout ({PROCESSOR_TIMEOUT}s) esperando respuesta del Servidor B"
         log.error(msg)
         return {"status": "error", "error": msg}
-    except ConnectionRefusedError:
-        msg = f"Conexión rechazada por Servidor B en {host}:{port}"
+    except BackendUnavailable as e:
+        msg = f"Servidor B no disponible ({pool.name}): {e}"
         log.error(msg)
         return {"status": "error", "error": msg}
     except Exception as e:
         msg = f"Error hablando con Servidor B: {e}"
         log.error(msg, exc_info=True)
         return {"status": "error", "error": msg}
-    finally:
-        if writer:
-            writer.close()
-            await writer.wait_closed()
 
-# --- 4. Handler HTTP /scrape ---
+# --- 4. Pipeline de análisis (Scraping + Servidor B) ---
 
-async def handle_scrape(request: web.Request):
-    url = request.query.get("url")
-    if not url:
-        return web.json_response(
-            {"status": "error", "message": 'Missing "url" query parameter'},
-            status=400,
-        )
+class ScrapeError(Exception):
+    """Error en la etapa de scraping, con el código HTTP que se devuelve al cliente."""
 
-    # Añadir esquema si falta
+    def __init__(self, http_status: int, message: str):
+        super().__init__(message)
+        self.http_status = http_status
+
+def ensure_scheme(url: str) -> str:
+    """Añade 'http://' si la URL no trae esquema."""
     if not url.startswith(('http://', 'https://')):
-        url = f"http://{url}"
+        return f"http://{url}"
+    return url
 
-    proc_host = request.app["processor_ip"]
-    proc_port = request.app["processor_port"]
-    session = request.app["client_session"]
+@contextmanager
+def observe_stage(app: web.Application, stage: str):
+    """Mide un bloque y lo registra en el histograma de etapas del Servidor A."""
+    timings = {}
+    try:
+        with stage_timer(timings, stage):
+            yield
+    finally:
+        app["metrics"].observe_timings("server_a_stage_seconds", timings)
+
+async def scrape_stage(app: web.Application, url: str) -> tuple:
+    """
+    Descarga y parsea la URL. Devuelve (scraping_data, image_urls).
+    Lanza ScrapeError si la descarga o el parseo fallan.
+
+    Si la página está en el cache de páginas, la descarga es condicional:
+    ante un 304 se reutilizan el HTML y el parseo guardados.
+    """
+    session = app["client_session"]
+    page_cache = app["page_cache"]
+    cached_page = page_cache.get(url)
 
-    log.info(f"Procesando URL: {url}")
-    
-    scraping_data = {}
-    content_data = {}
-    
     # --- A. Scraping Asíncrono (I/O-Bound) ---
     try:
-        html_content = await fetch_url(session, url)
-        
-        # Parseo (CPU-light, se hace en el event loop)
-        content_data = scrape_html_content(html_content, base_url=url)
-        meta_data = extract_meta_tags(html_content)
-
-        # Preparamos la parte 'scraping_data' de la respuesta
-        scraping_data = {
-            "title": content_data["title"],
-            "links": content_data["links"],
-            "meta_tags": meta_data,
-            "structure": content_data["structure"],
-            "images_count": content_data["images_count"],
-        }
-        
+        with observe_stage(app, "fetch"):
+            fetched = await fetch_page(
+                session, url, app["host_scheduler"],
+                max_bytes=app["max_body_bytes"],
+                validators=cached_page.validators() if cached_page else None,
+            )
+
+        if fetched.not_modified and cached_page is not None:
+            page_cache.revalidated += 1
+            log.info(f"Página sin cambios (304), se reutiliza el parseo: {url}")
+            if cached_page.parsed is not None:
+                return cached_page.parsed
+            html_content = cached_page.html
+        else:
+            html_content = fetched.html
+
+        with observe_stage(app, "parse"):
+            content_data, meta_data = await parse_html(app, html_content, url)
+
     except asyncio.TimeoutError:
         log.warning(f"Scraping timed out para: {url}")
-        return web.json_response(
-            {"status": "error", "message": "Scraping timed out (30s)"},
-            status=504, # Gateway Timeout
-        )
+        raise ScrapeError(504, "Scraping timed out (30s)") # Gateway Timeout
+    except UnsupportedContentError as e:
+        log.warning(str(e))
+        raise ScrapeError(415, str(e)) # Unsupported Media Type
     except ConnectionError as e:
         log.error(f"Error de conexión en scraping: {e}")
-        return web.json_response(
-            {"status": "error", "message": str(e)},
-            status=502, # Bad Gateway
-        )
+        raise ScrapeError(502, str(e)) # Bad Gateway
     except Exception as e:
         log.exception("Error no manejado en scraping")
-        return web.json_response(
-            {"status": "error", "message": f"Scraping failed: {e}"},
-            status=500,
-        )
+        raise ScrapeError(500, f"Scraping failed: {e}")
+
+    # Preparamos la parte 'scraping_data' de la respuesta
+    scraping_data = {
+        "title": content_data["title"],
+        "links": content_data["links"],
+        "meta_tags": meta_data,
+        "structure": content_data["structure"],
+        "images_count": content_data["images_count"],
+    }
+    parsed = (scraping_data, content_data.get("image_urls", []))
+
+    page_cache.put(url, PageEntry(
+        html_content,
+        fetched.etag or (cached_page.etag if cached_page else None),
+        fetched.last_modified or (cached_page.last_modified if cached_page else None),
+        parsed,
+    ))
+    return parsed
+
+async def parse_html(app: web.Application, html_content: str, url: str) -> tuple:
+    """
+    Parsea el HTML. Los documentos chicos se parsean en el event loop
+    (el costo de enviarlos a otro proceso sería mayor); los grandes van al
+    ProcessPoolExecutor para no frenar al resto de las peticiones.
+    """
+    executor = app["parse_executor"]
+    if executor is None or len(html_content) <= app["parse_inline_max_bytes"]:
+        return parse_page(html_content, url)
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, parse_page, html_content, url)
 
+async def process_stage(app: web.Application, url: str, image_urls: list) -> tuple:
+    """
+    Envía el trabajo al Servidor B. Devuelve (processing_data, final_status).
+    """
     # --- B. Envío a Servidor B (I/O-Bound socket) ---
     job = {
         "url": url,
-        "image_urls": content_data.get("image_urls", []),
+        "image_urls": image_urls,
     }
 
     # Esta llamada es asíncrona (await)
-    proc_resp = await talk_with_processor(job, proc_host, proc_port)
+    with observe_stage(app, "processor_round_trip"):
+        proc_resp = await talk_with_processor(job, app["processor_pool"])
+
+    # Etapas medidas por el Servidor B (no forman parte de la respuesta)
+    if isinstance(proc_resp, dict) and isinstance(proc_resp.get("timings"), dict):
+        app["metrics"].observe_timings("server_b_stage_seconds", proc_resp.pop("timings"))
 
     # Interpretar respuesta del Servidor B
     if not isinstance(proc_resp, dict):
-        processing_data = {"error": "Invalid response from processing server"}
-        final_status = "partial_success"
-    elif proc_resp.get("status") == "error" or proc_resp.get("error"):
+        return {"error": "Invalid response from processing server"}, "partial_success"
+    if proc_resp.get("status") == "error" or proc_resp.get("error"):
         log.warning(f"Error recibido del Servidor B: {proc_resp.get('error')}")
-        processing_data = proc_resp
-        final_status = "partial_success"
-    else: 
-        processing_data = proc_resp
-        final_status = "success"
-
-    # --- C. Consolidación de Respuesta (Transparencia) ---
-    response = {
+        return proc_resp, "partial_success"
+    # B responde igual si la captura falló o no terminó: sin screenshot o
+    # con el error en 'performance' el resultado está incompleto
+    performance = proc_resp.get("performance")
+    if not proc_resp.get("screenshot") or (isinstance(performance, dict) and "error" in performance):
+        error = performance.get("error") if isinstance(performance, dict) else None
+        log.warning(f"Captura incompleta del Servidor B para {url}: {error or 'sin screenshot'}")
+        return proc_resp, "partial_success"
+    return proc_resp, "success"
+
+def build_response(url: str, scraping_data: dict, processing_data: dict, final_status: str) -> dict:
+    """--- C. Consolidación de Respuesta (Transparencia) ---"""
+    return {
         "url": url,
         "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
         "scraping_data": scraping_data,
@@ -167,20 +240,633 @@ async def handle_scrape(request: web.Request):
         "status": final_status,
     }
 
+async def run_analysis(app: web.Application, url: str, on_scraped=None) -> tuple:
+    """
+    Ejecuta el pipeline completo para una URL.
+    Devuelve (http_status, cuerpo_de_respuesta).
+
+    Cada etapa se deduplica por separado: peticiones concurrentes para la
+    misma URL comparten una sola descarga/parseo y un solo job en B. Si se
+    pasa 'on_scraped', se la llama con scraping_data apenas esté lista,
+    antes de esperar al Servidor B.
+    """
+    key = normalize_url(url)
+    single_flight = app["single_flight"]
+    log.info(f"Procesando URL: {url}")
+
+    with observe_stage(app, "total"):
+        try:
+            scraping_data, image_urls = await single_flight.do(
+                ("scrape", key), lambda: scrape_stage(app, url)
+            )
+        except ScrapeError as e:
+            return e.http_status, {"status": "error", "message": str(e)}
+
+        if on_scraped is not None:
+            await on_scraped(scraping_data)
+
+        processing_data, final_status = await single_flight.do(
+            ("process", key), lambda: process_stage(app, url, image_urls)
+        )
+        response = build_response(url, scraping_data, processing_data, final_status)
+
+    # Solo se cachean respuestas completas (los errores de B pueden ser transitorios)
+    if final_status == "success":
+        app["result_cache"].put(url, response)
+        if app["result_store"] is not None:
+            app["result_store"].put(url, response)
+
     log.info(f"Finalizado {url} con estado: {final_status}")
-    return web.json_response(response, dumps=lambda x: json.dumps(x, indent=4))
+    return 200, response
+
+async def analyze_url(app: web.Application, url: str, on_scraped=None, shed: bool = True) -> tuple:
+    """
+    Punto de entrada del pipeline: consulta el cache (en memoria y luego en
+    disco) y, si no hay hit, ejecuta run_analysis pasando por el control de
+    admisión.
+    Devuelve (http_status, cuerpo_de_respuesta); 503 si el servidor está
+    saturado. Con shed=False (trabajo ya aceptado: tareas, lotes, crawls)
+    nunca se rechaza: se espera un lugar.
+    """
+    # Cache hit: no se vuelve a scrapear ni a consultar al Servidor B
+    cached = app["result_cache"].get(url)
+    if cached is not None:
+        log.info(f"Cache hit para: {url}")
+        if on_scraped is not None:
+            await on_scraped(cached["scraping_data"])
+        return 200, cached
 
-# --- 5. Inicialización y CLI ---
+    # Segundo nivel: store en disco, que sobrevive a los reinicios
+    if app["result_store"] is not None:
+        stored = await app["result_store"].get(url)
+        if stored is not None:
+            log.info(f"Hit en el store de respuestas para: {url}")
+            app["result_cache"].put(url, stored)
+            if on_scraped is not None:
+                await on_scraped(stored["scraping_data"])
+            return 200, stored
+
+    # Si ya hay un análisis en curso para la URL, sumarse no agrega carga
+    key = normalize_url(url)
+    single_flight = app["single_flight"]
+    if single_flight.in_progress(("scrape", key)) or single_flight.in_progress(("process", key)):
+        return await run_analysis(app, url, on_scraped)
+
+    # Control de admisión: con la cola llena se rechaza rápido (503)
+    try:
+        async with app["admission"].admit(shed=shed):
+            return await run_analysis(app, url, on_scraped)
+    except Overloaded as e:
+        log.warning(f"Petición rechazada para {url}: {e}")
+        return 503, {"status": "error", "message": str(e)}
+
+# --- 5. Handlers HTTP ---
+
+async def handle_scrape(request: web.Request):
+    url = request.query.get("url")
+    if not url:
+        return web.json_response(
+            {"status": "error", "message": 'Missing "url" query parameter'},
+            status=400,
+        )
+
+    # Añadir esquema si falta
+    url = ensure_scheme(url)
+
+    if request.query.get("stream", "").lower() in ("1", "true", "ndjson"):
+        return await stream_scrape(request, url)
+
+    status, response = await analyze_url(request.app, url)
+    if status != 200:
+        return error_response(response, status)
+    return encode_response(request, response)
+
+def encode_response(request: web.Request, data: dict, status: int = 200) -> web.Response:
+    """
+    Respuesta JSON compacta (indentada solo con ?pretty=1). Con --compress,
+    si el cliente acepta gzip/deflate (Accept-Encoding) y el cuerpo es
+    grande, aiohttp lo comprime (solo Huffman, ver COMPRESS_STRATEGY).
+    """
+    pretty = request.query.get("pretty", "").lower() in ("1", "true")
+    body = serialize_data(data, pretty=pretty)
+    response = web.Response(body=body, status=status, content_type="application/json")
+    if request.app["compress"] and len(body) >= COMPRESS_MIN_BYTES:
+        response.enable_compression(strategy=COMPRESS_STRATEGY)
+    return response
+
+def error_response(body: dict, status: int) -> web.Response:
+    """Respuesta JSON de error; los 503 llevan Retry-After."""
+    headers = {"Retry-After": str(RETRY_AFTER_SECONDS)} if status == 503 else None
+    return web.json_response(body, status=status, headers=headers)
+
+async def write_ndjson(response: web.StreamResponse, event: dict):
+    """Escribe un evento como una línea JSON (NDJSON) y la envía de inmediato."""
+    await response.write(serialize_data(event) + b"\n")
+
+async def stream_scrape(request: web.Request, url: str) -> web.StreamResponse:
+    """
+    Modo streaming (GET /scrape?url=...&stream=1): respuesta NDJSON por
+    chunks. Primero se envía la línea 'scraping_data', apenas termina el
+    scraping, y después 'processing_data' cuando responde el Servidor B.
+    Si el scraping falla se responde un JSON de error con su código HTTP.
+    """
+    response = None
+
+    async def on_scraped(scraping_data: dict):
+        nonlocal response
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        await write_ndjson(response, {"event": "scraping_data", "url": url, "scraping_data": scraping_data})
+
+    status, result = await analyze_url(request.app, url, on_scraped)
+    if response is None:
+        return error_response(result, status)
+
+    await write_ndjson(response, {
+        "event": "processing_data",
+        "url": url,
+        "timestamp": result["timestamp"],
+        "processing_data": result["processing_data"],
+        "status": result["status"],
+    })
+    await response.write_eof()
+    return response
+
+async def analyze_many(app: web.Application, urls: list, concurrency: int):
+    """
+    Analiza muchas URLs con concurrencia acotada. Es un generador asíncrono
+    que va entregando (índice, url, http_status, cuerpo) a medida que cada
+    URL termina. Un error en una URL no corta el resto del lote.
+    """
+    results: asyncio.Queue = asyncio.Queue()
+    pending = iter(enumerate(urls))
+
+    async def worker():
+        for index, url in pending:
+            try:
+                status, body = await analyze_url(app, url, shed=False)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.exception(f"Error no manejado analizando {url}")
+                status, body = 500, {"status": "error", "message": f"Analysis failed: {e}"}
+            await results.put((index, url, status, body))
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(urls)))]
+    try:
+        for _ in range(len(urls)):
+            yield await results.get()
+    finally:
+        # Si el cliente se desconecta se cancelan las URLs que faltan
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+async def handle_batch(request: web.Request):
+    """
+    POST /scrape/batch con cuerpo JSON {"urls": [...], "concurrency": N}.
+    Responde NDJSON: una línea 'result' por URL en el orden en que terminan
+    (con su propio http_status) y al final una línea 'summary'.
+    """
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        body = None
+    urls = body.get("urls") if isinstance(body, dict) else None
+    if not isinstance(urls, list) or not urls or not all(isinstance(u, str) and u for u in urls):
+        return web.json_response(
+            {"status": "error", "message": 'Body must be JSON {"urls": [<url>, ...]}'},
+            status=400,
+        )
+    if len(urls) > BATCH_MAX_URLS:
+        return web.json_response(
+            {"status": "error", "message": f"Too many URLs (max {BATCH_MAX_URLS})"},
+            status=413,
+        )
+
+    concurrency = body.get("concurrency", request.app["batch_concurrency"])
+    if not isinstance(concurrency, int) or concurrency < 1:
+        concurrency = request.app["batch_concurrency"]
+    concurrency = min(concurrency, request.app["batch_concurrency"])
+
+    response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+    response.enable_chunked_encoding()
+    await response.prepare(request)
+
+    log.info(f"Lote de {len(urls)} URLs (concurrencia {concurrency})")
+    start = time.monotonic()
+    succeeded = 0
+    async for index, url, status, result in analyze_many(
+            request.app, [ensure_scheme(u.strip()) for u in urls], concurrency):
+        if status == 200:
+            succeeded += 1
+        await write_ndjson(response, {
+            "event": "result", "index": index, "url": url, "http_status": status, "result": result,
+        })
+
+    await write_ndjson(response, {
+        "event": "summary",
+        "total": len(urls),
+        "succeeded": succeeded,
+        "failed": len(urls) - succeeded,
+        "elapsed_ms": round((time.monotonic() - start) * 1000, 2),
+    })
+    await response.write_eof()
+    return response
+
+def _int_field(body: dict, name: str, default: int, upper: int) -> int:
+    """Entero positivo de un cuerpo JSON, acotado a 'upper' (default si no es válido)."""
+    value = body.get(name, default)
+    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+        value = default
+    return min(value, upper)
+
+async def handle_crawl(request: web.Request):
+    """
+    POST /crawl con cuerpo JSON {"url": ..., "max_depth": N, "max_pages": N,
+    "same_domain": true, "concurrency": N}. Sigue los links de cada página
+    analizada y responde NDJSON: una línea 'page' por página en el orden en
+    que terminan y al final una línea 'summary' con páginas por segundo.
+    """
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        body = None
+    url = body.get("url") if isinstance(body, dict) else None
+    if not isinstance(url, str) or not url.strip():
+        return web.json_response(
+            {"status": "error", "message": 'Body must be JSON {"url": <seed url>, ...}'},
+            status=400,
+        )
+
+    crawl_concurrency = request.app["crawl_concurrency"]
+    crawler = Crawler(
+        lambda page_url: analyze_url(request.app, page_url, shed=False),
+        ensure_scheme(url.strip()),
+        max_depth=_int_field(body, "max_depth", DEFAULT_MAX_DEPTH, MAX_DEPTH_LIMIT),
+        max_pages=_int_field(body, "max_pages", DEFAULT_MAX_PAGES, MAX_PAGES_LIMIT),
+        same_domain=body.get("same_domain", True) is not False,
+        concurrency=_int_field(body, "concurrency", crawl_concurrency, crawl_concurrency) or crawl_concurrency,
+    )
+
+    response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+    response.enable_chunked_encoding()
+    await response.prepare(request)
+
+    log.info(f"Crawl desde {crawler.seed} (profundidad {crawler.max_depth}, "
+             f"máx. {crawler.max_pages} páginas, concurrencia {crawler.concurrency})")
+    async for depth, page_url, status, result in crawler.run():
+        await write_ndjson(response, {
+            "event": "page", "depth": depth, "url": page_url, "http_status": status, "result": result,
+        })
+
+    summary = crawler.summary()
+    log.info(f"Crawl terminado: {summary['pages']} páginas a {summary['pages_per_second']} páginas/s")
+    await write_ndjson(response, {"event": "summary", **summary})
+    await response.write_eof()
+    return response
+
+async def handle_submit(request: web.Request):
+    """
+    POST /scrape: encola el análisis y devuelve un task_id de inmediato.
+    La URL llega como query param 'url' o en un cuerpo JSON {"url": ...}.
+    """
+    url = request.query.get("url")
+    if not url and request.can_read_body:
+        try:
+            body = await request.json()
+            url = body.get("url") if isinstance(body, dict) else None
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            url = None
+    if not url:
+        return web.json_response(
+            {"status": "error", "message": 'Missing "url" (query parameter or JSON body)'},
+            status=400,
+        )
+
+    try:
+        task = await request.app["task_queue"].submit(ensure_scheme(url))
+    except asyncio.QueueFull:
+        log.warning("Cola de tareas llena, se rechaza la petición.")
+        return web.json_response(
+            {"status": "error", "message": "Task queue is full, retry later"},
+            status=503,
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        )
+
+    log.info(f"Tarea {task.id} encolada para: {task.url}")
+    return web.json_response(
+        {
+            **task.status(),
+            "status_url": f"/status/{task.id}",
+            "result_url": f"/result/{task.id}",
+        },
+        status=202, # Accepted
+    )
+
+async def handle_status(request: web.Request):
+    """GET /status/{task_id}: estado de una tarea."""
+    record = await request.app["task_queue"].get(request.match_info["task_id"])
+    if record is None:
+        return web.json_response({"status": "error", "message": "Unknown or expired task"}, status=404)
+    status, _ = record
+    return web.json_response(status)
+
+async def handle_result(request: web.Request):
+    """
+    GET /result/{task_id}: resultado de una tarea terminada.
+    Si todavía no terminó devuelve 202 con su estado.
+    """
+    record = await request.app["task_queue"].get(request.match_info["task_id"])
+    if record is None:
+        return web.json_response({"status": "error", "message": "Unknown or expired task"}, status=404)
+    status, result = record
+    if status["state"] not in (DONE, FAILED):
+        return web.json_response(status, status=202)
+    if status["http_status"] != 200:
+        # La tarea ya terminó: reintentar el GET no cambia nada, así que sin Retry-After
+        return web.json_response(result, status=status["http_status"])
+    return encode_response(request, result)
+
+@web.middleware
+async def metrics_middleware(request: web.Request, handler):
+    """Cuenta respuestas por ruta/código y mide la latencia de cada ruta."""
+    route = request.match_info.route.resource.canonical if request.match_info.route.resource else "unmatched"
+    metrics = request.app["metrics"]
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        metrics.observe("http_request_seconds", time.perf_counter() - start,
+                        {"method": request.method, "route": route})
+        metrics.inc("http_responses_total", labels={"route": route, "code": str(status)})
+
+async def handle_metrics(request: web.Request):
+    """
+    GET /metrics: métricas en formato texto (estilo Prometheus). En modo
+    prefork incluye las de todos los workers (label 'worker'): las propias
+    al momento y las de los demás según su último snapshot.
+    """
+    app = request.app
+    others = []
+    if app["metrics_dir"]:
+        loop = asyncio.get_running_loop()
+        others = await loop.run_in_executor(None, read_snapshots, app["metrics_dir"], app["metrics_name"])
+    return web.Response(text=app["metrics"].render(others), content_type="text/plain")
+
+async def publish_metrics(app):
+    """Modo prefork: guarda periódicamente las métricas del worker en el directorio compartido."""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            families = app["metrics"].families()
+            await loop.run_in_executor(None, write_snapshot, app["metrics_dir"], app["metrics_name"], families)
+        except OSError as e:
+            log.warning(f"No se pudo publicar el snapshot de métricas: {e}")
+        await asyncio.sleep(METRICS_SNAPSHOT_INTERVAL)
+
+def register_gauges(app: web.Application):
+    """Gauges que se leen de los componentes al publicar /metrics."""
+    metrics = app["metrics"]
+    metrics.gauge("admission_in_flight", lambda: {(): app["admission"].in_flight},
+                  "Análisis admitidos en curso")
+    metrics.gauge("admission_queue_depth", lambda: {(): app["admission"].waiting},
+                  "Análisis esperando admisión")
+    metrics.gauge("admission_rejected", lambda: {(): app["admission"].rejected},
+                  "Peticiones rechazadas con 503 (acumulado)")
+    metrics.gauge("processor_in_flight", lambda: {
+        (("backend", pool.name),): pool.in_flight() for pool in app["processor_pool"].pools
+    }, "Trabajos enviados a cada Servidor B sin respuesta")
+    metrics.gauge("processor_circuit_open", lambda: {
+        (("backend", pool.name),): int(breaker.is_open)
+        for pool, breaker in zip(app["processor_pool"].pools, app["processor_pool"].breakers)
+    }, "1 si el circuit breaker del Servidor B está abierto")
+    metrics.gauge("result_cache", lambda: {
+        (("kind", k),): v for k, v in app["result_cache"].stats().items()
+    }, "Contadores del cache de respuestas")
+    if app["result_store"] is not None:
+        metrics.gauge("result_store", lambda: {
+            (("kind", k),): v for k, v in app["result_store"].stats().items()
+        }, "Contadores del store de respuestas en disco")
+    metrics.gauge("task_queue", lambda: {
+        (("kind", k),): v for k, v in app["task_queue"].stats().items()
+    }, "Estado de la cola de tareas")
+
+async def handle_stats(request: web.Request):
+    """Devuelve contadores internos del Servidor A (cache, coalescing y tareas)."""
+    return web.json_response({
+        "result_cache": request.app["result_cache"].stats(),
+        "result_store": await request.app["result_store"].summary() if request.app["result_store"] else None,
+        "page_cache": request.app["page_cache"].stats(),
+        "single_flight": {
+            "in_flight": request.app["single_flight"].in_flight(),
+            "coalesced": request.app["single_flight"].coalesced,
+        },
+        "processor_in_flight": request.app["processor_pool"].in_flight(),
+        "processor": request.app["processor_pool"].stats(),
+        "admission": request.app["admission"].stats(),
+        "task_queue": request.app["task_queue"].stats(),
+        "fetch_scheduler": request.app["host_scheduler"].stats(),
+    })
+
+# --- 6. Inicialización y CLI ---
 
 async def on_startup(app):
-    """Crea la sesión de aiohttp."""
+    """Crea la sesión de aiohttp y el pool de conexiones al Servidor B."""
     app['client_session'] = aiohttp.ClientSession()
     log.info("Sesión de cliente aiohttp creada.")
+    app['host_scheduler'] = HostScheduler(
+        host_concurrency=app["host_concurrency"],
+        host_rate=app["host_rate"],
+        global_concurrency=app["global_concurrency"],
+    )
+    app['processor_pool'] = ProcessorCluster(
+        app["processor_backends"],
+        size=app["processor_connections"],
+        max_pending=app["processor_max_pending"],
+        breaker_failures=app["breaker_failures"],
+        breaker_cooldown=app["breaker_cooldown"],
+    )
+    app['task_queue'] = TaskQueue(
+        lambda url: analyze_url(app, url, shed=False),
+        concurrency=app["task_concurrency"],
+        max_queued=app["task_max_queued"],
+        retention=app["task_retention"],
+        task_dir=app["task_dir"],
+    )
+    await app['task_queue'].start()
+    app['result_store'] = None
+    if app["store_path"]:
+        app['result_store'] = ResultStore(
+            app["store_path"], ttl=app["store_ttl"], max_bytes=app["store_max_bytes"]
+        )
+        await app['result_store'].open()
+    register_gauges(app)
+    app['metrics_publisher'] = None
+    if app["metrics_dir"]:
+        app['metrics_publisher'] = asyncio.create_task(publish_metrics(app))
+    # 'spawn': no se hace fork de un proceso con un event loop corriendo
+    app['parse_executor'] = None
+    if app["parse_workers"] > 0:
+        app['parse_executor'] = ProcessPoolExecutor(
+            max_workers=app["parse_workers"],
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        log.info(f"Pool de parseo iniciado con {app['parse_workers']} procesos.")
 
 async def on_cleanup(app):
-    """Cierra la sesión de aiohttp."""
+    """Cierra la sesión de aiohttp y las conexiones al Servidor B."""
+    if app['metrics_publisher'] is not None:
+        app['metrics_publisher'].cancel()
+        await asyncio.gather(app['metrics_publisher'], return_exceptions=True)
+    await app['task_queue'].stop()
+    if app['result_store'] is not None:
+        await app['result_store'].close()
     await app['client_session'].close()
     log.info("Sesión de cliente aiohttp cerrada.")
+    await app['processor_pool'].close()
+    if app['parse_executor'] is not None:
+        app['parse_executor'].shutdown(wait=True, cancel_futures=True)
+
+def build_app(args, worker_id: int = None) -> web.Application:
+    """Crea la aplicación aiohttp (una por proceso worker)."""
+    app = web.Application(middlewares=[metrics_middleware])
+    app["worker_id"] = worker_id
+    
+    # Guardamos la config de B en la app para el handler
+    app["processor_backends"] = args.processor_backends
+    app["processor_max_pending"] = args.processor_max_pending
+    app["breaker_failures"] = args.breaker_failures
+    app["breaker_cooldown"] = args.breaker_cooldown
+    app["processor_connections"] = args.processor_connections
+    app["parse_workers"] = args.parse_workers
+    app["parse_inline_max_bytes"] = args.parse_inline_max_bytes
+    app["max_body_bytes"] = args.max_body_bytes
+    app["compress"] = args.compress
+    app["host_concurrency"] = args.host_concurrency
+    app["host_rate"] = args.host_rate
+    app["global_concurrency"] = args.global_concurrency
+    app["batch_concurrency"] = args.batch_concurrency
+    app["crawl_concurrency"] = args.crawl_concurrency
+    app["task_concurrency"] = args.task_concurrency
+    app["task_max_queued"] = args.task_max_queued
+    app["task_retention"] = args.task_retention
+    app["task_dir"] = args.task_dir
+    app["result_cache"] = ResultCache(
+        ttl=args.cache_ttl,
+        max_entries=args.cache_max_entries,
+        max_bytes=args.cache_max_bytes,
+    )
+    app["store_path"] = args.store_path
+    app["store_ttl"] = args.store_ttl
+    app["store_max_bytes"] = args.store_max_bytes
+    app["page_cache"] = PageCache(max_bytes=args.page_cache_max_bytes)
+    app["single_flight"] = SingleFlight()
+    # En prefork cada worker etiqueta sus series y comparte un snapshot con los demás
+    app["metrics"] = MetricsRegistry(const_labels={"worker": str(worker_id)} if worker_id is not None else None)
+    app["metrics_dir"] = getattr(args, "metrics_dir", None) if worker_id is not None else None
+    app["metrics_name"] = f"worker-{worker_id}"
+    app["metrics"].describe("server_a_stage_seconds", "Duración de cada etapa en el Servidor A")
+    app["metrics"].describe("server_b_stage_seconds", "Duración de cada etapa informada por el Servidor B")
+    app["admission"] = AdmissionController(max_in_flight=args.max_in_flight, max_queue=args.max_queue)
+    
+    # Rutas y ciclo de vida
+    app.router.add_get("/scrape", handle_scrape)
+    app.router.add_post("/scrape", handle_submit)
+    app.router.add_post("/scrape/batch", handle_batch)
+    app.router.add_post("/crawl", handle_crawl)
+    app.router.add_get("/status/{task_id}", handle_status)
+    app.router.add_get("/result/{task_id}", handle_result)
+    app.router.add_get("/stats", handle_stats)
+    app.router.add_get("/metrics", handle_metrics)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+def create_listen_socket(host: str, port: int) -> socket.socket:
+    """
+    Crea el socket de escucha compartido por todos los workers.
+    Soporta IPv4/IPv6 según lo que resuelva 'host'.
+    """
+    family, type_, proto, _, sockaddr = socket.getaddrinfo(
+        host, port, type=socket.SOCK_STREAM, flags=socket.AI_PASSIVE
+    )[0]
+    sock = socket.socket(family, type_, proto)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(sockaddr)
+    sock.listen(LISTEN_BACKLOG)
+    sock.setblocking(False)
+    return sock
+
+def run_worker(sock: socket.socket, args, worker_id: int):
+    """
+    Proceso worker: su propio event loop, su propia ClientSession y sus
+    propias conexiones a B, aceptando conexiones del socket heredado.
+    """
+    log.info(f"Worker {worker_id} (PID {os.getpid()}) iniciado.")
+    app = build_app(args, worker_id)
+    web.run_app(app, sock=sock, print=None)
+
+def serve_prefork(args):
+    """
+    Modo prefork: el proceso padre abre el socket de escucha y lanza
+    'args.workers' procesos que lo heredan. El kernel reparte las conexiones
+    entre los workers. Si un worker muere se relanza; con SIGINT/SIGTERM el
+    padre reenvía SIGTERM a los workers y espera su cierre ordenado.
+    """
+    sock = create_listen_socket(args.ip, args.port)
+    ctx = multiprocessing.get_context("fork")
+
+    # Las tareas de POST /scrape deben poder consultarse desde cualquier worker
+    own_task_dir = args.task_dir is None
+    if own_task_dir:
+        args.task_dir = tempfile.mkdtemp(prefix="tp2-tasks-")
+    # /metrics de cualquier worker publica las métricas de todos
+    args.metrics_dir = tempfile.mkdtemp(prefix="tp2-metrics-")
+
+    def spawn(worker_id: int):
+        proc = ctx.Process(target=run_worker, args=(sock, args, worker_id), name=f"worker-{worker_id}")
+        proc.start()
+        return proc
+
+    workers = {i: spawn(i) for i in range(args.workers)}
+
+    def on_terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, on_terminate)
+
+    try:
+        while True:
+            sentinels = {p.sentinel: i for i, p in workers.items()}
+            for sentinel in multiprocessing.connection.wait(list(sentinels)):
+                worker_id = sentinels[sentinel]
+                log.warning(f"Worker {worker_id} terminó (exit code {workers[worker_id].exitcode}). Relanzando...")
+                workers[worker_id] = spawn(worker_id)
+    except KeyboardInterrupt:
+        log.info("Deteniendo workers...")
+    finally:
+        for proc in workers.values():
+            if proc.is_alive():
+                proc.terminate() # SIGTERM: aiohttp hace el cierre ordenado
+        for proc in workers.values():
+            proc.join(timeout=SHUTDOWN_TIMEOUT)
+            if proc.is_alive():
+                log.warning(f"{proc.name} no terminó a tiempo, forzando cierre.")
+                proc.kill()
+                proc.join()
+        sock.close()
+        if own_task_dir:
+            shutil.rmtree(args.task_dir, ignore_errors=True)
+        shutil.rmtree(args.metrics_dir, ignore_errors=True)
+        log.info("Servidor A detenido.")
 
 def main():
     parser = argparse.ArgumentParser(
@@ -189,36 +875,106 @@ def main():
     )
     parser.add_argument("-i", "--ip", required=True, help="Dirección de escucha (soporta IPv4/IPv6)")
     parser.add_argument("-p", "--port", required=True, type=int, help="Puerto de escucha")
-    parser.add_argument("-w", "--workers", type=int, default=4, help="Número de workers (default: 4)")
+    parser.add_argument("-w", "--workers", type=int, default=4,
+                        help="Número de procesos worker (1 = un solo proceso, sin prefork)")
     
     # Argumentos para conectar con Servidor B
     parser.add_argument("--processor-ip", default="127.0.0.1", help="IP del Servidor B")
     parser.add_argument("--processor-port", type=int, default=8001, help="Puerto del Servidor B")
+    parser.add_argument("--processor-connections", type=int, default=DEFAULT_POOL_SIZE,
+                        help="Conexiones persistentes hacia cada Servidor B (por worker)")
+    parser.add_argument("--processor", action="append", default=[], metavar="HOST:PORT",
+                        help="Servidor B como host:port; se repite para usar varios "
+                             "(reemplaza a --processor-ip/--processor-port)")
+    parser.add_argument("--processor-max-pending", type=int, default=DEFAULT_MAX_PENDING,
+                        help="Trabajos en vuelo a partir de los cuales un Servidor B se considera "
+                             "saturado y se usa otro (por worker, 0 = sin límite)")
+    parser.add_argument("--breaker-failures", type=int, default=DEFAULT_BREAKER_FAILURES,
+                        help="Fallos seguidos (timeouts o conexión) que dejan a un Servidor B fuera de servicio")
+    parser.add_argument("--breaker-cooldown", type=float, default=DEFAULT_BREAKER_COOLDOWN,
+                        help="Segundos que un Servidor B queda fuera de servicio antes de reintentar")
 
-    args = parser.parse_args()
+    # Argumentos del scheduler de descargas
+    parser.add_argument("--max-body-bytes", type=int, default=MAX_BODY_BYTES,
+                        help="Bytes máximos a descargar por página (el resto se descarta)")
+    parser.add_argument("--host-concurrency", type=int, default=DEFAULT_HOST_CONCURRENCY,
+                        help="Descargas simultáneas por host (por worker)")
+    parser.add_argument("--host-rate", type=float, default=DEFAULT_HOST_RATE,
+                        help="Peticiones por segundo por host (por worker, 0 = sin límite)")
+    parser.add_argument("--global-concurrency", type=int, default=DEFAULT_GLOBAL_CONCURRENCY,
+                        help="Descargas simultáneas en total (por worker)")
 
-    app = web.Application()
-    
-    # Guardamos la config de B en la app para el handler
-    app["processor_ip"] = args.processor_ip
-    app["processor_port"] = args.processor_port
-    
-    # Rutas y ciclo de vida
-    app.router.add_get("/scrape", handle_scrape)
-    app.on_startup.append(on_startup)
-    app.on_cleanup.append(on_cleanup)
+    # Argumentos del parseo de HTML
+    parser.add_argument("--parse-workers", type=int, default=DEFAULT_PARSE_WORKERS,
+                        help="Procesos para parsear HTML grande (por worker, 0 = siempre en el event loop)")
+    parser.add_argument("--parse-inline-max-bytes", type=int, default=DEFAULT_PARSE_INLINE_MAX_BYTES,
+                        help="Tamaño de HTML hasta el cual se parsea en el event loop")
+
+    # Argumentos del control de admisión
+    parser.add_argument("--max-in-flight", type=int, default=DEFAULT_MAX_IN_FLIGHT,
+                        help="Análisis simultáneos admitidos (por worker, 0 = sin límite)")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE,
+                        help="Análisis en espera antes de responder 503 (por worker)")
+
+    # Argumentos de la cola de tareas (POST /scrape)
+    parser.add_argument("--task-concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Tareas ejecutándose a la vez (por worker)")
+    parser.add_argument("--task-max-queued", type=int, default=DEFAULT_MAX_QUEUED,
+                        help="Tareas en espera antes de responder 503 (por worker)")
+    parser.add_argument("--task-retention", type=float, default=DEFAULT_RETENTION_SECONDS,
+                        help="Segundos que se conserva el resultado de una tarea terminada")
+    parser.add_argument("--task-dir", default=None,
+                        help="Directorio compartido para el estado de las tareas "
+                             "(en prefork se crea uno temporal si no se indica)")
+
+    # Compresión de las respuestas JSON
+    parser.add_argument("--compress", action="store_true",
+                        help="Comprimir (gzip/deflate) las respuestas grandes si el cliente lo acepta; "
+                             "cuesta CPU por respuesta y ahorra ~25%% (el Base64 comprime poco)")
+
+    # Argumentos de los lotes (POST /scrape/batch)
+    parser.add_argument("--batch-concurrency", type=int, default=DEFAULT_BATCH_CONCURRENCY,
+                        help="URLs de un lote analizándose a la vez (tope para el campo 'concurrency')")
+
+    # Argumentos del modo crawl (POST /crawl)
+    parser.add_argument("--crawl-concurrency", type=int, default=DEFAULT_CRAWL_CONCURRENCY,
+                        help="Páginas de un crawl analizándose a la vez (tope para el campo 'concurrency')")
+
+    # Argumentos del cache de respuestas
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL_SECONDS,
+                        help="Segundos de vida de una respuesta cacheada (0 desactiva el cache)")
+    parser.add_argument("--cache-max-entries", type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="Cantidad máxima de respuestas en cache (por worker)")
+    parser.add_argument("--cache-max-bytes", type=int, default=DEFAULT_MAX_BYTES,
+                        help="Tamaño máximo del cache en bytes (por worker)")
+    parser.add_argument("--store-path", default=None,
+                        help="Archivo SQLite para guardar respuestas en disco entre reinicios "
+                             "(compartido por los workers; sin indicar no se usa)")
+    parser.add_argument("--store-ttl", type=float, default=DEFAULT_STORE_TTL,
+                        help="Segundos de vida de una respuesta en el store en disco")
+    parser.add_argument("--store-max-bytes", type=int, default=DEFAULT_STORE_MAX_BYTES,
+                        help="Tamaño máximo del store en disco (se compactan las entradas más antiguas)")
+    parser.add_argument("--page-cache-max-bytes", type=int, default=DEFAULT_PAGE_CACHE_BYTES,
+                        help="Tamaño máximo del cache de páginas para revalidación ETag/Last-Modified "
+                             "(por worker, 0 lo desactiva)")
+
+    args = parser.parse_args()
+    try:
+        args.processor_backends = [parse_backend(b) for b in args.processor] or [
+            (args.processor_ip, args.processor_port)
+        ]
+    except ValueError as e:
+        parser.error(str(e))
 
     log.info(f"Servidor A (Scraping) escuchando en {args.ip}:{args.port} (workers: {args.workers})")
-    log.info(f"Usando Servidor B (Procesamiento) en {args.processor_ip}:{args.processor_port}")
-
-    # web.run_app maneja el event loop y soporta IPv4/v6 en 'host'
-    web.run_app(
-        app, 
-        host=args.ip, 
-        port=args.port,
-        # 'workers' solo funciona en producción, no con auto-reload
-        # workers=args.workers 
-    )
+    backends = ", ".join(f"{host}:{port}" for host, port in args.processor_backends)
+    log.info(f"Usando Servidor B (Procesamiento) en {backends}")
+
+    if args.workers > 1:
+        serve_prefork(args)
+    else:
+        # web.run_app maneja el event loop y soporta IPv4/v6 en 'host'
+        web.run_app(build_app(args), host=args.ip, port=args.port)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()